@@ -0,0 +1,94 @@
+"""
+Micro-benchmark: SQLiteIdempotencyStore.insert_or_get under duplicate-heavy traffic.
+
+Compares the current single-statement upsert (INSERT ... ON CONFLICT DO UPDATE
+... RETURNING, one round trip through the aiosqlite thread) with the previous
+exception-driven path (INSERT, catch IntegrityError, then SELECT).
+
+Group commit and the event cache are off, so every call reaches SQLite and pays
+its own commit.
+
+Run:
+    uv run python benchmarks/insert_or_get.py
+    uv run python benchmarks/insert_or_get.py --ops 20000 --mixes 0 0.5 0.9 0.99
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+import aiosqlite
+
+from webhook_receiver.database import open_db
+from webhook_receiver.store import _EVENT_COLUMNS, Event, SQLiteIdempotencyStore, _now, _row_to_event
+
+
+class ExceptionPathStore(SQLiteIdempotencyStore):
+    """insert_or_get as it was before the upsert: INSERT, IntegrityError, SELECT."""
+
+    async def _insert(self, request: dict) -> tuple[Event, bool]:
+        now = _now()
+        event_id = str(uuid.uuid4())
+        try:
+            await self._conn.execute(
+                "INSERT INTO events(id,idempotency_key,event_type,payload,status,"
+                "attempts,last_error,retry_after,created_at,updated_at) "
+                "VALUES(?,?,?,?,'pending',0,NULL,NULL,?,?)",
+                (event_id, request["idempotency_key"], request["event_type"], json.dumps(request["payload"]), now, now),
+            )
+        except aiosqlite.IntegrityError:
+            async with self._conn.execute(
+                f"SELECT {_EVENT_COLUMNS} FROM events WHERE idempotency_key=?", (request["idempotency_key"],)
+            ) as cursor:
+                return _row_to_event(await cursor.fetchone()), False
+        async with self._conn.execute(f"SELECT {_EVENT_COLUMNS} FROM events WHERE id=?", (event_id,)) as cursor:
+            return _row_to_event(await cursor.fetchone()), True
+
+
+def _requests(ops: int, duplicate_ratio: float, seed_keys: list[str]) -> list[dict]:
+    rng = random.Random(42)
+    return [
+        {
+            "idempotency_key": rng.choice(seed_keys) if rng.random() < duplicate_ratio else str(uuid.uuid4()),
+            "event_type": "order.created",
+            "payload": {"amount": 99, "currency": "PLN"},
+        }
+        for _ in range(ops)
+    ]
+
+
+async def _run(store_cls: type[SQLiteIdempotencyStore], ops: int, duplicate_ratio: float) -> float:
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = await open_db(str(Path(tmp) / "bench.db"))
+        store = store_cls(conn)
+        seed_keys = [f"seed-{i}" for i in range(1000)]
+        for key in seed_keys:
+            await store.insert_or_get({"idempotency_key": key, "event_type": "seed", "payload": {}})
+        requests = _requests(ops, duplicate_ratio, seed_keys)
+        start = time.perf_counter()
+        for request in requests:
+            await store.insert_or_get(request)
+        elapsed = time.perf_counter() - start
+        await conn.close()
+    return ops / elapsed
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ops", type=int, default=5000)
+    parser.add_argument("--mixes", type=float, nargs="+", default=[0.0, 0.5, 0.9])
+    args = parser.parse_args()
+    print(f"{'duplicates':>10} {'exception path':>16} {'upsert':>10} {'speedup':>8}")
+    for ratio in args.mixes:
+        before = await _run(ExceptionPathStore, args.ops, ratio)
+        after = await _run(SQLiteIdempotencyStore, args.ops, ratio)
+        print(f"{ratio:>10.0%} {before:>12.0f} op/s {after:>6.0f} op/s {after / before:>7.2f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,139 @@
+"""
+Micro-benchmark: CPU cost of POST /webhooks, pydantic path vs raw-body fast path.
+
+Both handlers run in the same FastAPI app against an in-memory store and queue, so
+only HTTP handling, body parsing and response serialization are measured. Requests
+are driven straight through the ASGI interface (no sockets). Throughput is
+reported as requests per CPU-second of this single-threaded process, i.e. per core.
+
+Run:
+    uv run python benchmarks/post_webhook.py
+    uv run python benchmarks/post_webhook.py --requests 5000 --payload-kb 1 16 64
+"""
+
+import argparse
+import asyncio
+import json
+import time
+import uuid
+
+from fastapi import APIRouter, Depends, FastAPI
+from fastapi.responses import JSONResponse
+
+from webhook_receiver.dependencies import get_queue, get_store
+from webhook_receiver.models import WebhookRequest, WebhookResponse
+from webhook_receiver.queue import AsyncioEventQueue
+from webhook_receiver.router import router
+from webhook_receiver.store import Event, _now, _payload_text
+
+legacy = APIRouter()
+
+
+class MemoryStore:
+    def __init__(self) -> None:
+        self._events: dict[str, Event] = {}
+
+    async def insert_or_get(self, request: dict) -> tuple[Event, bool]:
+        if event := self._events.get(request["idempotency_key"]):
+            return event, False
+        now = _now()
+        payload = _payload_text(request["payload"])
+        event = Event(
+            str(uuid.uuid4()),
+            request["idempotency_key"],
+            request["event_type"],
+            "pending",
+            0,
+            None,
+            None,
+            now,
+            now,
+            payload,
+        )
+        self._events[event.idempotency_key] = event
+        return event, True
+
+
+@legacy.post("/legacy/webhooks")
+async def post_webhook_legacy(
+    body: WebhookRequest,
+    store: MemoryStore = Depends(get_store),
+    queue: AsyncioEventQueue = Depends(get_queue),
+) -> JSONResponse:
+    """POST /webhooks as it was before the fast path."""
+    event, is_new = await store.insert_or_get(body.model_dump())
+    if is_new:
+        await queue.put(event.id)
+    response = WebhookResponse(
+        id=event.id, idempotency_key=event.idempotency_key, status=event.status, created_at=event.created_at
+    )
+    return JSONResponse(content=response.model_dump(), status_code=202 if is_new else 200)
+
+
+async def _post(app: FastAPI, path: str, body: bytes) -> int:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        "server": ("bench", 80),
+        "client": ("bench", 1),
+    }
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    status = 0
+
+    async def receive() -> dict:
+        return messages.pop() if messages else {"type": "http.disconnect"}
+
+    async def send(message: dict) -> None:
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+def _bodies(n: int, payload_kb: int) -> list[bytes]:
+    items = [{"sku": f"SKU-{i}", "qty": i, "price": 19.99, "tags": ["a", "b"]} for i in range(payload_kb * 12)]
+    payload = {"order_id": "ORD-1", "items": items}
+    return [
+        json.dumps({"idempotency_key": str(uuid.uuid4()), "event_type": "order.created", "payload": payload}).encode()
+        for _ in range(n)
+    ]
+
+
+async def _run(path: str, n: int, payload_kb: int) -> float:
+    app = FastAPI()
+    app.include_router(router)
+    app.include_router(legacy)
+    store, queue = MemoryStore(), AsyncioEventQueue(maxsize=n + 1)
+    app.dependency_overrides[get_store] = lambda: store
+    app.dependency_overrides[get_queue] = lambda: queue
+    bodies = _bodies(n, payload_kb)
+    start = time.process_time()
+    for body in bodies:
+        assert await _post(app, path, body) == 202
+    return n / (time.process_time() - start)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--payload-kb", type=int, nargs="+", default=[1, 16, 64])
+    args = parser.parse_args()
+    print(f"{'payload':>8} {'pydantic path':>18} {'fast path':>14} {'speedup':>8}")
+    for kb in args.payload_kb:
+        before = await _run("/legacy/webhooks", args.requests, kb)
+        after = await _run("/webhooks", args.requests, kb)
+        print(f"{kb:>6}KB {before:>10.0f} req/s/core {after:>6.0f} req/s/core {after / before:>7.2f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
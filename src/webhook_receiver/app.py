@@ -1,18 +1,64 @@
 import asyncio
+import os
+import socket
 from collections.abc import AsyncIterator
 from contextlib import asynccontextmanager
 
+import aiosqlite
 from fastapi import FastAPI
 
+from webhook_receiver.cache import EventCache
 from webhook_receiver.cleanup import cleanup_task
 from webhook_receiver.config import Settings
-from webhook_receiver.database import open_db
+from webhook_receiver.database import ReaderPool, open_db, open_reader_pool
 from webhook_receiver.dependencies import get_settings
 from webhook_receiver.logging_setup import configure_logging
-from webhook_receiver.queue import AsyncioEventQueue
+from webhook_receiver.metrics import QUEUE_DEPTH
+from webhook_receiver.queue import AsyncioEventQueue, EventQueue, SQLiteEventQueue
 from webhook_receiver.router import router
+from webhook_receiver.scheduler import RetryScheduler
+from webhook_receiver.sharding import ShardedEventQueue, ShardedIdempotencyStore, shard_id_prefix, shard_paths
 from webhook_receiver.store import SQLiteIdempotencyStore
-from webhook_receiver.workers import load_pending, worker
+from webhook_receiver.workers import load_pending, reap_leases, worker
+
+
+async def _open_shard(
+    settings: Settings, db_path: str, id_prefix: str
+) -> tuple[aiosqlite.Connection, ReaderPool | None, SQLiteIdempotencyStore]:
+    db = await open_db(db_path)
+    readers = await open_reader_pool(db_path, settings.reader_pool_size) if settings.reader_pool_size else None
+    store = SQLiteIdempotencyStore(
+        db,
+        insert_batch_window=settings.insert_batch_window_ms / 1000,
+        insert_batch_size=settings.insert_batch_size,
+        status_flush_window=settings.status_flush_interval_ms / 1000,
+        status_flush_size=settings.status_flush_size,
+        readers=readers,
+        cache=_cache(settings),
+        id_prefix=id_prefix,
+        lease_duration=settings.lease_seconds,
+    )
+    return db, readers, store
+
+
+def _cache(settings: Settings) -> EventCache | None:
+    # With the shared SQLite queue other processes change statuses behind this
+    # process's back, so a per-process cache would serve stale ones (ADR 0014).
+    if not settings.cache_enabled or settings.queue_backend == "sqlite":
+        return None
+    return EventCache(settings.cache_max_size, settings.cache_ttl_seconds)
+
+
+def _open_queue(settings: Settings, store: SQLiteIdempotencyStore) -> EventQueue:
+    if settings.queue_backend == "sqlite":
+        return SQLiteEventQueue(
+            store,
+            owner=f"{socket.gethostname()}:{os.getpid()}",
+            maxsize=settings.queue_maxsize,
+            claim_batch=settings.claim_batch_size,
+            poll_interval=settings.claim_poll_interval_ms / 1000,
+        )
+    return AsyncioEventQueue(maxsize=settings.queue_maxsize)
 
 
 def create_app(settings: Settings | None = None) -> FastAPI:
@@ -22,17 +68,43 @@ def create_app(settings: Settings | None = None) -> FastAPI:
     async def lifespan(app: FastAPI) -> AsyncIterator[None]:
         configure_logging(settings.log_level)
         app.state.ready = False
-        app.state.db = await open_db(settings.db_path)
-        app.state.queue = AsyncioEventQueue(maxsize=settings.queue_maxsize)
-        store = SQLiteIdempotencyStore(app.state.db)
-        await load_pending(app.state.queue, store)
-        tasks = [asyncio.create_task(worker(app.state.queue, store, settings)) for _ in range(settings.worker_count)]
-        tasks.append(asyncio.create_task(cleanup_task(store, settings)))
+        # One writer, reader pool, cache, queue and worker group per database file.
+        paths = shard_paths(settings.db_path, settings.shard_count)
+        sharded = len(paths) > 1
+        shards = [
+            await _open_shard(settings, path, shard_id_prefix(i) if sharded else "") for i, path in enumerate(paths)
+        ]
+        stores = [store for _, _, store in shards]
+        queues = [_open_queue(settings, store) for store in stores]
+        if sharded:
+            app.state.store = ShardedIdempotencyStore(stores)
+            app.state.queue = ShardedEventQueue(queues)
+        else:
+            app.state.store, app.state.queue = stores[0], queues[0]
+        QUEUE_DEPTH.set_function(app.state.queue.qsize)
+        # The in-memory queue needs a retry scheduler and startup recovery. The SQLite
+        # queue needs neither: claims take due pending rows, retries included,
+        # straight from the table in whichever process polls first.
+        in_memory = settings.queue_backend == "memory"
+        scheduler = RetryScheduler(app.state.queue) if in_memory else None
+        tasks = [asyncio.create_task(scheduler.run())] if scheduler is not None else []
+        for store, queue in zip(stores, queues, strict=True):
+            tasks.extend(
+                asyncio.create_task(worker(queue, store, settings, scheduler)) for _ in range(settings.worker_count)
+            )
+            if in_memory:
+                # Ingest is safe as soon as the store is up; recovery drains in the background.
+                tasks.append(asyncio.create_task(load_pending(queue, store, scheduler, settings.recovery_chunk_size)))
+            tasks.append(asyncio.create_task(reap_leases(queue, store, settings.lease_reaper_interval_seconds)))
+            tasks.append(asyncio.create_task(cleanup_task(store, settings)))
         app.state.ready = True
         yield
         for task in tasks:
             task.cancel()
-        await app.state.db.close()
+        for db, readers, _ in shards:
+            if readers is not None:
+                await readers.close()
+            await db.close()
 
     app = FastAPI(lifespan=lifespan)
     app.include_router(router)
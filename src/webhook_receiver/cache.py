@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import dataclasses
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import TYPE_CHECKING, Any
+
+from webhook_receiver.metrics import CACHE_EVICTIONS_TOTAL, CACHE_HITS_TOTAL, CACHE_MISSES_TOTAL
+
+if TYPE_CHECKING:
+    from webhook_receiver.store import Event
+
+
+class EventCache:
+    """Bounded LRU of full `Event` rows with a TTL, kept current by write-through.
+
+    The store writes every committed insert and status transition through to the
+    cache (see ADR 0014), so a hit always carries the current status.
+    `generation` changes on every write-through; the store compares it before and
+    after a DB read to avoid caching a row that a transition overtook meanwhile.
+    """
+
+    def __init__(self, max_size: int, ttl: float) -> None:
+        self._max_size = max_size
+        self._ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, Event]] = OrderedDict()
+        self._ids_by_key: dict[str, str] = {}
+        self.generation = 0
+
+    def get_by_id(self, event_id: str) -> Event | None:
+        entry = self._entries.get(event_id)
+        if entry is not None and entry[0] <= time.monotonic():
+            self._evict(event_id, "ttl")
+            entry = None
+        if entry is None:
+            CACHE_MISSES_TOTAL.inc()
+            return None
+        self._entries.move_to_end(event_id)
+        CACHE_HITS_TOTAL.inc()
+        return entry[1]
+
+    def get_by_idempotency_key(self, key: str) -> Event | None:
+        event_id = self._ids_by_key.get(key)
+        if event_id is None:
+            CACHE_MISSES_TOTAL.inc()
+            return None
+        return self.get_by_id(event_id)
+
+    def put(self, event: Event) -> None:
+        self.generation += 1
+        self._entries[event.id] = (time.monotonic() + self._ttl, event)
+        self._entries.move_to_end(event.id)
+        self._ids_by_key[event.idempotency_key] = event.id
+        while len(self._entries) > self._max_size:
+            self._evict(next(iter(self._entries)), "size")
+
+    def update(self, event_id: str, **changes: Any) -> None:
+        # Cached events are never mutated in place: callers may still hold them.
+        self.generation += 1
+        entry = self._entries.get(event_id)
+        if entry is not None:
+            self.put(dataclasses.replace(entry[1], **changes))
+
+    def discard_if(self, predicate: Callable[[Event], bool]) -> None:
+        self.generation += 1
+        for event_id in [event_id for event_id, (_, event) in self._entries.items() if predicate(event)]:
+            self._evict(event_id, "delete")
+
+    def _evict(self, event_id: str, reason: str) -> None:
+        _, event = self._entries.pop(event_id)
+        del self._ids_by_key[event.idempotency_key]
+        CACHE_EVICTIONS_TOTAL.labels(reason=reason).inc()
@@ -3,12 +3,12 @@ import logging
 from datetime import UTC, datetime, timedelta
 
 from webhook_receiver.config import Settings
-from webhook_receiver.store import SQLiteIdempotencyStore
+from webhook_receiver.store import IdempotencyStore
 
 logger = logging.getLogger(__name__)
 
 
-async def cleanup_task(store: SQLiteIdempotencyStore, settings: Settings) -> None:
+async def cleanup_task(store: IdempotencyStore, settings: Settings) -> None:
     while True:
         cutoff = datetime.now(UTC) - timedelta(days=settings.retention_days)
         before = cutoff.isoformat()
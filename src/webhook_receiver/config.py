@@ -1,9 +1,26 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings
 
 
 class Settings(BaseSettings):
     worker_count: int = 85
     queue_maxsize: int = 1000
+    queue_backend: Literal["memory", "sqlite"] = "memory"
+    claim_batch_size: int = 32
+    claim_poll_interval_ms: float = 50.0
+    shard_count: int = 1
+    recovery_chunk_size: int = 500
+    lease_seconds: float = 60.0
+    lease_reaper_interval_seconds: float = 5.0
+    insert_batch_window_ms: float = 2.0
+    insert_batch_size: int = 100
+    status_flush_interval_ms: float = 5.0
+    status_flush_size: int = 500
+    reader_pool_size: int = 4
+    cache_enabled: bool = True
+    cache_max_size: int = 10_000
+    cache_ttl_seconds: float = 300.0
     max_attempts: int = 5
     retry_base_delay: float = 5.0
     retry_max_delay: float = 300.0
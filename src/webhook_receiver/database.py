@@ -1,13 +1,82 @@
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 from importlib.resources import files
+from pathlib import Path
 
 import aiosqlite
 
 _SCHEMA = files("webhook_receiver").joinpath("schema.sql").read_text()
 
+# Applied in order on top of schema.sql; PRAGMA user_version counts how many ran.
+# Append only — never edit or reorder an entry that has shipped.
+_MIGRATIONS = [
+    "ALTER TABLE events ADD COLUMN claimed_by TEXT",
+    "ALTER TABLE events ADD COLUMN lease_expires_at TEXT",
+    # Rows left in 'processing' before leases existed count as already expired.
+    "UPDATE events SET lease_expires_at = updated_at WHERE status = 'processing'",
+    # Partial: only in-flight rows, so the reaper never scans finished history.
+    "CREATE INDEX idx_events_processing_lease ON events (lease_expires_at) WHERE status = 'processing'",
+]
+
 
 async def open_db(db_path: str) -> aiosqlite.Connection:
     conn = await aiosqlite.connect(db_path)
     await conn.execute("PRAGMA journal_mode=WAL")
     await conn.execute("PRAGMA busy_timeout=5000")
     await conn.executescript(_SCHEMA)
+    await _migrate(conn)
     return conn
+
+
+async def _migrate(conn: aiosqlite.Connection) -> None:
+    # BEGIN IMMEDIATE takes the write lock before reading the version, so processes
+    # starting side by side on one file run each migration exactly once.
+    await conn.execute("BEGIN IMMEDIATE")
+    try:
+        async with conn.execute("PRAGMA user_version") as cursor:
+            (version,) = await cursor.fetchone()
+        for sql in _MIGRATIONS[version:]:
+            await conn.execute(sql)
+        await conn.execute(f"PRAGMA user_version={len(_MIGRATIONS)}")
+        await conn.commit()
+    except BaseException:
+        await conn.rollback()
+        raise
+
+
+class ReaderPool:
+    """Read-only connections, each with its own aiosqlite thread.
+
+    WAL lets readers run alongside the single writer, so lookups served from here
+    no longer queue behind inserts and status updates on the writer's thread.
+    """
+
+    def __init__(self, conns: list[aiosqlite.Connection]) -> None:
+        self._conns = conns
+        self._idle: asyncio.Queue[aiosqlite.Connection] = asyncio.Queue()
+        for conn in conns:
+            self._idle.put_nowait(conn)
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[aiosqlite.Connection]:
+        conn = await self._idle.get()
+        try:
+            yield conn
+        finally:
+            self._idle.put_nowait(conn)
+
+    async def close(self) -> None:
+        for conn in self._conns:
+            await conn.close()
+
+
+async def open_reader_pool(db_path: str, size: int) -> ReaderPool:
+    # The writer must be opened first: it creates the schema and the WAL files.
+    uri = f"{Path(db_path).absolute().as_uri()}?mode=ro"
+    conns = []
+    for _ in range(size):
+        conn = await aiosqlite.connect(uri, uri=True)
+        await conn.execute("PRAGMA busy_timeout=5000")
+        conns.append(conn)
+    return ReaderPool(conns)
@@ -1,11 +1,10 @@
 from functools import lru_cache
 
-import aiosqlite
-from fastapi import Depends, Request
+from fastapi import Request
 
 from webhook_receiver.config import Settings
-from webhook_receiver.queue import AsyncioEventQueue
-from webhook_receiver.store import SQLiteIdempotencyStore
+from webhook_receiver.queue import EventQueue
+from webhook_receiver.store import IdempotencyStore
 
 
 @lru_cache
@@ -13,15 +12,10 @@ def get_settings() -> Settings:
     return Settings()
 
 
-async def get_db(request: Request) -> aiosqlite.Connection:
-    return request.app.state.db
+async def get_store(request: Request) -> IdempotencyStore:
+    # One store per app: its group-commit batcher must see every request.
+    return request.app.state.store
 
 
-async def get_store(
-    db: aiosqlite.Connection = Depends(get_db),
-) -> SQLiteIdempotencyStore:
-    return SQLiteIdempotencyStore(db)
-
-
-async def get_queue(request: Request) -> AsyncioEventQueue:
+async def get_queue(request: Request) -> EventQueue:
     return request.app.state.queue
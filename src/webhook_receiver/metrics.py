@@ -21,3 +21,46 @@ PROCESSING_ERRORS_TOTAL = Counter(
     "webhook_processing_errors_total",
     "Total number of processing errors",
 )
+
+STATUS_FLUSH_SIZE = Histogram(
+    "webhook_status_flush_size",
+    "Number of status transitions written per batched flush",
+    buckets=[1, 5, 10, 25, 50, 100, 250, 500],
+)
+
+STATUS_FLUSH_DURATION = Histogram(
+    "webhook_status_flush_duration_seconds",
+    "Duration of one batched status-transition flush (one transaction)",
+    buckets=[0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25],
+)
+
+CACHE_HITS_TOTAL = Counter(
+    "webhook_cache_hits_total",
+    "Event lookups served from the in-memory status cache",
+)
+
+CACHE_MISSES_TOTAL = Counter(
+    "webhook_cache_misses_total",
+    "Event lookups that fell through to SQLite",
+)
+
+CACHE_EVICTIONS_TOTAL = Counter(
+    "webhook_cache_evictions_total",
+    "Events removed from the status cache",
+    ["reason"],
+)
+
+RETRIES_SCHEDULED = Gauge(
+    "webhook_retries_scheduled",
+    "Failed events waiting in the retry scheduler for their retry_after",
+)
+
+LEASES_EXPIRED_TOTAL = Counter(
+    "webhook_leases_expired_total",
+    "In-flight events whose lease ran out and that the reaper re-enqueued",
+)
+
+RECOVERY_REMAINING = Gauge(
+    "webhook_recovery_remaining",
+    "Pending events found at startup that recovery has not enqueued yet",
+)
@@ -1,7 +1,14 @@
+import json
+import re
+from json.decoder import scanstring
+from json.encoder import encode_basestring_ascii
 from typing import Any
 
+from fastapi.exceptions import RequestValidationError
 from pydantic import BaseModel
 
+from webhook_receiver.store import Event
+
 
 class WebhookRequest(BaseModel):
     idempotency_key: str
@@ -22,3 +29,90 @@ class EventStatusResponse(BaseModel):
     status: str
     created_at: str
     updated_at: str
+
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_DECODER = json.JSONDecoder()
+_WEBHOOK_RESPONSE = '{{"id":{},"idempotency_key":{},"status":{},"created_at":{}}}'
+_EVENT_STATUS_RESPONSE = '{{"id":{},"idempotency_key":{},"status":{},"created_at":{},"updated_at":{}}}'
+
+
+def parse_webhook_request(raw: bytes) -> dict[str, str]:
+    """Fast-path equivalent of `WebhookRequest.model_validate_json(raw).model_dump()`.
+
+    Only `idempotency_key` and `event_type` are validated field by field; `payload`
+    must be a JSON object and is returned as its original text, so it is stored
+    without being re-serialized. Errors are raised in FastAPI's 422 shape.
+    """
+    try:
+        fields = _top_level_fields(raw.decode())
+    except ValueError as e:  # includes UnicodeDecodeError and JSONDecodeError
+        raise RequestValidationError(
+            [{"type": "json_invalid", "loc": ("body",), "msg": "JSON decode error", "ctx": {"error": str(e)}}]
+        ) from e
+    errors = [
+        _field_error(fields, "idempotency_key", str, "string_type", "a valid string"),
+        _field_error(fields, "event_type", str, "string_type", "a valid string"),
+        _field_error(fields, "payload", dict, "dict_type", "a valid dictionary"),
+    ]
+    if any(errors):
+        raise RequestValidationError([error for error in errors if error])
+    return {
+        "idempotency_key": fields["idempotency_key"][0],
+        "event_type": fields["event_type"][0],
+        "payload": fields["payload"][1],
+    }
+
+
+def render_webhook_response(event: Event) -> bytes:
+    """Serializes the `WebhookResponse` shape straight from an `Event`."""
+    fields = (event.id, event.idempotency_key, event.status, event.created_at)
+    return _WEBHOOK_RESPONSE.format(*map(encode_basestring_ascii, fields)).encode()
+
+
+def render_event_status(event: Event) -> bytes:
+    """Serializes the `EventStatusResponse` shape straight from an `Event`."""
+    fields = (event.id, event.idempotency_key, event.status, event.created_at, event.updated_at)
+    return _EVENT_STATUS_RESPONSE.format(*map(encode_basestring_ascii, fields)).encode()
+
+
+def _field_error(fields: dict[str, tuple[Any, str]], name: str, kind: type, error: str, expected: str) -> dict | None:
+    if name not in fields:
+        return {"type": "missing", "loc": ("body", name), "msg": "Field required", "input": None}
+    if not isinstance(fields[name][0], kind):
+        return {"type": error, "loc": ("body", name), "msg": f"Input should be {expected}", "input": fields[name][0]}
+    return None
+
+
+def _top_level_fields(text: str) -> dict[str, tuple[Any, str]]:
+    # Walks the top-level object only; each value is decoded by the C scanner and
+    # kept next to its exact source text.
+    fields: dict[str, tuple[Any, str]] = {}
+    idx = _skip(text, _expect(text, _skip(text, 0), "{"))
+    if text.startswith("}", idx):
+        return _expect_end(text, idx + 1, fields)
+    while True:
+        key, idx = scanstring(text, _expect(text, idx, '"'))
+        start = _skip(text, _expect(text, _skip(text, idx), ":"))
+        value, idx = _DECODER.raw_decode(text, start)
+        fields[key] = (value, text[start:idx])
+        idx = _skip(text, idx)
+        if not text.startswith(",", idx):
+            return _expect_end(text, _expect(text, idx, "}"), fields)
+        idx = _skip(text, idx + 1)
+
+
+def _skip(text: str, idx: int) -> int:
+    return _WHITESPACE.match(text, idx).end()
+
+
+def _expect(text: str, idx: int, char: str) -> int:
+    if not text.startswith(char, idx):
+        raise ValueError(f"Expecting {char!r} at char {idx}")
+    return idx + 1
+
+
+def _expect_end(text: str, idx: int, fields: dict[str, tuple[Any, str]]) -> dict[str, tuple[Any, str]]:
+    if _skip(text, idx) != len(text):
+        raise ValueError(f"Extra data at char {idx}")
+    return fields
@@ -1,6 +1,14 @@
+from __future__ import annotations
+
 import asyncio
+import math
+import time
+from collections import deque
+from datetime import UTC, datetime
 from typing import Protocol
 
+from webhook_receiver.store import SQLiteIdempotencyStore
+
 
 class EventQueue(Protocol):
     async def put(self, event_id: str) -> None: ...
@@ -11,6 +19,9 @@ class EventQueue(Protocol):
 
     def qsize(self) -> int: ...
 
+    # The queue `event_id` ends up on (its shard's), so full() is checked on that one.
+    def route(self, event_id: str) -> EventQueue: ...
+
 
 class AsyncioEventQueue:
     def __init__(self, maxsize: int) -> None:
@@ -28,3 +39,71 @@ class AsyncioEventQueue:
 
     def qsize(self) -> int:
         return self._q.qsize()
+
+    def route(self, event_id: str) -> AsyncioEventQueue:
+        return self
+
+
+class SQLiteEventQueue:
+    """The `events` table itself as the queue, shared by every process on the file.
+
+    `get()` claims due pending rows with one `UPDATE ... RETURNING` (see
+    `SQLiteIdempotencyStore.claim`), so no event is handed to two processes. Rows
+    are claimed `claim_batch` at a time into a small local buffer. `put()` only
+    wakes local consumers: the row is already in the table, and other processes
+    find it on their next poll.
+
+    `qsize()` / `full()` count due pending rows in the whole database, so
+    backpressure is global too. The count is re-read when consumers claim, at
+    most every `poll_interval`, and bumped locally by `put()` in between.
+    """
+
+    def __init__(
+        self, store: SQLiteIdempotencyStore, owner: str, maxsize: int, claim_batch: int, poll_interval: float
+    ) -> None:
+        self._store = store
+        self._owner = owner
+        self._maxsize = maxsize
+        self._claim_batch = claim_batch
+        self._poll_interval = poll_interval
+        self._claimed: deque[str] = deque()
+        self._claim_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._depth = 0
+        self._depth_checked = -math.inf
+
+    async def put(self, event_id: str) -> None:
+        self._depth += 1
+        self._wakeup.set()
+
+    async def get(self) -> str:
+        while not self._claimed:
+            async with self._claim_lock:
+                if self._claimed:  # another consumer refilled while we waited for the lock
+                    break
+                await self._refresh_depth()
+                self._wakeup.clear()
+                if ids := await self._store.claim(self._owner, self._claim_batch):
+                    self._claimed.extend(ids)
+                    self._depth = max(self._depth - len(ids), 0)
+                    break
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self._poll_interval)
+                except TimeoutError:
+                    pass
+        return self._claimed.popleft()
+
+    async def _refresh_depth(self) -> None:
+        if time.monotonic() - self._depth_checked < self._poll_interval:
+            return
+        self._depth = await self._store.count_ready(datetime.now(UTC).isoformat())
+        self._depth_checked = time.monotonic()
+
+    def full(self) -> bool:
+        return self._depth >= self._maxsize
+
+    def qsize(self) -> int:
+        return self._depth + len(self._claimed)
+
+    def route(self, event_id: str) -> SQLiteEventQueue:
+        return self
@@ -1,68 +1,84 @@
 import logging
 
 from fastapi import APIRouter, Depends, HTTPException, Request
-from fastapi.responses import JSONResponse, Response
+from fastapi.responses import Response
 from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 
 from webhook_receiver.dependencies import get_queue, get_store
-from webhook_receiver.metrics import EVENTS_TOTAL, QUEUE_DEPTH
-from webhook_receiver.models import EventStatusResponse, WebhookRequest, WebhookResponse
-from webhook_receiver.queue import AsyncioEventQueue
-from webhook_receiver.store import SQLiteIdempotencyStore
+from webhook_receiver.metrics import EVENTS_TOTAL
+from webhook_receiver.models import (
+    EventStatusResponse,
+    WebhookRequest,
+    WebhookResponse,
+    parse_webhook_request,
+    render_event_status,
+    render_webhook_response,
+)
+from webhook_receiver.queue import EventQueue
+from webhook_receiver.store import IdempotencyStore
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
-@router.post("/webhooks")
+# The body is parsed by hand (parse_webhook_request), so the schema is declared here
+# to keep /docs accurate.
+_WEBHOOK_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {"application/json": {"schema": WebhookRequest.model_json_schema()}},
+    }
+}
+
+
+@router.post(
+    "/webhooks",
+    openapi_extra=_WEBHOOK_OPENAPI,
+    responses={200: {"model": WebhookResponse}, 202: {"model": WebhookResponse}},
+)
 async def post_webhook(
-    body: WebhookRequest,
-    store: SQLiteIdempotencyStore = Depends(get_store),
-    queue: AsyncioEventQueue = Depends(get_queue),
-) -> JSONResponse:
-    event, is_new = await store.insert_or_get(body.model_dump())
+    request: Request,
+    store: IdempotencyStore = Depends(get_store),
+    queue: EventQueue = Depends(get_queue),
+) -> Response:
+    body = parse_webhook_request(await request.body())
+    event, is_new = await store.insert_or_get(body)
     if is_new:
-        if queue.full():
+        target = queue.route(event.id)
+        if target.full():
             logger.warning("Queue full, rejecting event %s", event.id)
             EVENTS_TOTAL.labels(result="rejected").inc()
             raise HTTPException(status_code=429, detail="Queue full, retry later")
-        await queue.put(event.id)
+        await target.put(event.id)
         EVENTS_TOTAL.labels(result="accepted").inc()
-        QUEUE_DEPTH.set(queue.qsize())
-        logger.info("Accepted event %s type=%s", event.id, body.event_type)
+        logger.info("Accepted event %s type=%s", event.id, body["event_type"])
     else:
         EVENTS_TOTAL.labels(result="duplicate").inc()
-        logger.info("Duplicate event idempotency_key=%s", body.idempotency_key)
-    response = WebhookResponse(
-        id=event.id,
-        idempotency_key=event.idempotency_key,
-        status=event.status,
-        created_at=event.created_at,
-    )
+        logger.info("Duplicate event idempotency_key=%s", body["idempotency_key"])
     status_code = 202 if is_new else 200
-    return JSONResponse(content=response.model_dump(), status_code=status_code)
+    return Response(content=render_webhook_response(event), status_code=status_code, media_type="application/json")
 
 
-@router.get("/webhooks/{event_id}")
+@router.get("/webhooks/{event_id}", responses={200: {"model": EventStatusResponse}})
 async def get_by_id(
     event_id: str,
-    store: SQLiteIdempotencyStore = Depends(get_store),
-) -> EventStatusResponse:
+    store: IdempotencyStore = Depends(get_store),
+) -> Response:
     event = await store.get_by_id(event_id)
     if event is None:
         raise HTTPException(status_code=404)
-    return EventStatusResponse(**event.__dict__)
+    return Response(content=render_event_status(event), media_type="application/json")
 
 
-@router.get("/webhooks")
+@router.get("/webhooks", responses={200: {"model": EventStatusResponse}})
 async def get_by_idempotency_key(
     idempotency_key: str,
-    store: SQLiteIdempotencyStore = Depends(get_store),
-) -> EventStatusResponse:
+    store: IdempotencyStore = Depends(get_store),
+) -> Response:
     event = await store.get_by_idempotency_key(idempotency_key)
     if event is None:
         raise HTTPException(status_code=404)
-    return EventStatusResponse(**event.__dict__)
+    return Response(content=render_event_status(event), media_type="application/json")
 
 
 @router.get("/health")
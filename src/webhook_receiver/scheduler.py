@@ -0,0 +1,49 @@
+import asyncio
+import heapq
+import time
+from datetime import datetime
+
+from webhook_receiver.metrics import RETRIES_SCHEDULED
+from webhook_receiver.queue import EventQueue
+
+
+class RetryScheduler:
+    """Puts events back on the queue once their `retry_after` has passed.
+
+    Keeps a min-heap of `(due, event_id)` — one small tuple per scheduled retry —
+    and a single task that sleeps until the earliest entry is due, so nothing
+    polls the database. State is rebuilt from the `retry_after` column on startup
+    (see `load_pending`).
+    """
+
+    def __init__(self, queue: EventQueue) -> None:
+        self._queue = queue
+        self._heap: list[tuple[float, str]] = []
+        self._changed = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def schedule(self, event_id: str, retry_after: str) -> None:
+        due = datetime.fromisoformat(retry_after).timestamp()
+        heapq.heappush(self._heap, (due, event_id))
+        RETRIES_SCHEDULED.set(len(self._heap))
+        if self._heap[0][1] == event_id:  # new earliest entry: the sleeper must wake up sooner
+            self._changed.set()
+
+    async def run(self) -> None:
+        while True:
+            await self._release_due()
+            self._changed.clear()
+            timeout = self._heap[0][0] - time.time() if self._heap else None
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout)
+            except TimeoutError:
+                pass
+
+    async def _release_due(self) -> None:
+        now = time.time()
+        while self._heap and self._heap[0][0] <= now:
+            _, event_id = heapq.heappop(self._heap)
+            await self._queue.put(event_id)
+        RETRIES_SCHEDULED.set(len(self._heap))
@@ -0,0 +1,135 @@
+import zlib
+from collections.abc import AsyncIterator
+from pathlib import Path
+
+from webhook_receiver.queue import EventQueue
+from webhook_receiver.store import Event, IdempotencyStore, Transition
+
+
+def shard_paths(db_path: str, count: int) -> list[str]:
+    """`/data/events.db` stays as is for one shard, else `/data/events.0.db`, ..."""
+    if count == 1:
+        return [db_path]
+    path = Path(db_path)
+    return [str(path.with_name(f"{path.stem}.{index}{path.suffix}")) for index in range(count)]
+
+
+def shard_id_prefix(index: int) -> str:
+    # Event ids carry their shard, so lookups by id need no fan-out: "3.<uuid>".
+    return f"{index}."
+
+
+def shard_for_key(idempotency_key: str, count: int) -> int:
+    # crc32 rather than hash(): the mapping must survive restarts (PYTHONHASHSEED).
+    return zlib.crc32(idempotency_key.encode()) % count
+
+
+def shard_for_id(event_id: str, count: int) -> int | None:
+    head, sep, _ = event_id.partition(".")
+    if not sep or not head.isdigit() or int(head) >= count:
+        return None
+    return int(head)
+
+
+class ShardedIdempotencyStore:
+    """Spreads events over several single-file stores by `idempotency_key`.
+
+    Every key always lands on the same shard, so the per-shard UNIQUE constraint is
+    as exact as the single-file one; ids are routed by their shard prefix.
+    """
+
+    def __init__(self, shards: list[IdempotencyStore]) -> None:
+        self.shards = shards
+
+    def _by_key(self, key: str) -> IdempotencyStore:
+        return self.shards[shard_for_key(key, len(self.shards))]
+
+    def _by_id(self, event_id: str) -> IdempotencyStore | None:
+        index = shard_for_id(event_id, len(self.shards))
+        return None if index is None else self.shards[index]
+
+    def _require(self, event_id: str) -> IdempotencyStore:
+        if (shard := self._by_id(event_id)) is None:
+            raise KeyError(event_id)
+        return shard
+
+    async def insert_or_get(self, request: dict) -> tuple[Event, bool]:
+        return await self._by_key(request["idempotency_key"]).insert_or_get(request)
+
+    async def get_by_id(self, event_id: str) -> Event | None:
+        shard = self._by_id(event_id)
+        return None if shard is None else await shard.get_by_id(event_id)
+
+    async def get_by_idempotency_key(self, key: str) -> Event | None:
+        return await self._by_key(key).get_by_idempotency_key(key)
+
+    async def get_payload(self, event_id: str) -> str | None:
+        shard = self._by_id(event_id)
+        return None if shard is None else await shard.get_payload(event_id)
+
+    async def mark_processing(self, event_id: str) -> None:
+        await self._require(event_id).mark_processing(event_id)
+
+    async def extend_lease(self, event_id: str, seconds: float | None = None) -> bool:
+        return await self._require(event_id).extend_lease(event_id, seconds)
+
+    async def reap_expired_leases(self, now: str) -> list[str]:
+        return [event_id for shard in self.shards for event_id in await shard.reap_expired_leases(now)]
+
+    async def mark_completed(self, event_id: str) -> None:
+        await self._require(event_id).mark_completed(event_id)
+
+    async def mark_failed(
+        self,
+        event_id: str,
+        error: str,
+        max_attempts: int,
+        base_delay: float,
+        max_delay: float,
+    ) -> Transition:
+        return await self._require(event_id).mark_failed(event_id, error, max_attempts, base_delay, max_delay)
+
+    async def count_pending(self, now: str) -> int:
+        return sum([await shard.count_pending(now) for shard in self.shards])
+
+    async def iter_pending_ids(self, now: str, chunk_size: int) -> AsyncIterator[list[str]]:
+        for shard in self.shards:
+            async for chunk in shard.iter_pending_ids(now, chunk_size):
+                yield chunk
+
+    async def get_scheduled_retries(self, now: str) -> list[tuple[str, str]]:
+        return [retry for shard in self.shards for retry in await shard.get_scheduled_retries(now)]
+
+    async def delete_expired(self, before: str) -> int:
+        return sum([await shard.delete_expired(before) for shard in self.shards])
+
+
+class ShardedEventQueue:
+    """One queue per shard; ingest and the retry scheduler put through here and
+    each event lands in the queue of the shard that stores it.
+
+    Consumption is per shard: every shard's worker group reads its own queue from
+    `shards`, so there is no `get()` across shards.
+    """
+
+    def __init__(self, shards: list[EventQueue]) -> None:
+        self.shards = shards
+
+    def route(self, event_id: str) -> EventQueue:
+        index = shard_for_id(event_id, len(self.shards))
+        if index is None:
+            raise KeyError(event_id)
+        return self.shards[index]
+
+    async def put(self, event_id: str) -> None:
+        await self.route(event_id).put(event_id)
+
+    async def get(self) -> str:
+        raise NotImplementedError("workers consume the per-shard queues in ShardedEventQueue.shards")
+
+    def full(self) -> bool:
+        # Backpressure is per shard (see route()); this only reports total exhaustion.
+        return all(queue.full() for queue in self.shards)
+
+    def qsize(self) -> int:
+        return sum(queue.qsize() for queue in self.shards)
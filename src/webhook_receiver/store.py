@@ -1,83 +1,306 @@
+import asyncio
 import json
+import time
 import uuid
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
 from dataclasses import dataclass
 from datetime import UTC, datetime, timedelta
+from typing import Protocol
 
 import aiosqlite
 
+from webhook_receiver.cache import EventCache
+from webhook_receiver.database import ReaderPool
+from webhook_receiver.metrics import STATUS_FLUSH_DURATION, STATUS_FLUSH_SIZE
+
 
 def _now() -> str:
     return datetime.now(UTC).isoformat()
 
 
-@dataclass
+@dataclass(slots=True)
 class Event:
     id: str
     idempotency_key: str
     event_type: str
-    payload: str
     status: str
     attempts: int
     last_error: str | None
     retry_after: str | None
     created_at: str
     updated_at: str
+    payload: str | None = None  # not loaded by default, see SQLiteIdempotencyStore.get_payload
+
+
+# Everything but the payload, in Event field order. Lookups, the insert's RETURNING
+# and the cache never carry payload text; only the worker that handles the event
+# needs it.
+_EVENT_COLUMNS = "id,idempotency_key,event_type,status,attempts,last_error,retry_after,created_at,updated_at"
 
 
 def _row_to_event(row: aiosqlite.Row) -> Event:
     return Event(*row)
 
 
+def _payload_text(payload: dict | str) -> str:
+    # The HTTP fast path hands over the payload's original JSON text as-is.
+    return payload if isinstance(payload, str) else json.dumps(payload)
+
+
+@dataclass(slots=True)
+class Transition:
+    event_id: str
+    status: str
+    attempts: int | None = None  # set only for failures, which also record the error
+    last_error: str | None = None
+    retry_after: str | None = None
+
+
+class IdempotencyStore(Protocol):
+    async def insert_or_get(self, request: dict) -> tuple[Event, bool]: ...
+
+    async def get_by_id(self, event_id: str) -> Event | None: ...
+
+    async def get_by_idempotency_key(self, key: str) -> Event | None: ...
+
+    async def get_payload(self, event_id: str) -> str | None: ...
+
+    async def mark_processing(self, event_id: str) -> None: ...
+
+    async def extend_lease(self, event_id: str, seconds: float | None = None) -> bool: ...
+
+    async def reap_expired_leases(self, now: str) -> list[str]: ...
+
+    async def mark_completed(self, event_id: str) -> None: ...
+
+    async def mark_failed(
+        self,
+        event_id: str,
+        error: str,
+        max_attempts: int,
+        base_delay: float,
+        max_delay: float,
+    ) -> Transition: ...
+
+    async def count_pending(self, now: str) -> int: ...
+
+    def iter_pending_ids(self, now: str, chunk_size: int) -> AsyncIterator[list[str]]: ...
+
+    async def get_scheduled_retries(self, now: str) -> list[tuple[str, str]]: ...
+
+    async def delete_expired(self, before: str) -> int: ...
+
+
+class WriteBatcher[T, R]:
+    """Group commit: items submitted within `window` seconds (or until `max_size`
+    items are waiting) are handed to `flush` together, so they share one transaction.
+
+    `flush` returns one result per item, in order; an exception in place of a
+    result fails only that item's caller.
+    """
+
+    def __init__(
+        self,
+        flush: Callable[[list[T]], Awaitable[list[R | Exception]]],
+        window: float,
+        max_size: int,
+    ) -> None:
+        self._flush = flush
+        self._window = window
+        self._max_size = max_size
+        self._pending: list[tuple[T, asyncio.Future[R]]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task[None]] = set()
+
+    async def submit(self, item: T) -> R:
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future[R] = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self._max_size:
+            self._start_flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self._window, self._start_flush)
+        return await future
+
+    def _start_flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        task = asyncio.create_task(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: list[tuple[T, asyncio.Future[R]]]) -> None:
+        try:
+            results = await self._flush([item for item, _ in batch])
+        except Exception as e:
+            results = [e] * len(batch)
+        for (_, future), result in zip(batch, results, strict=True):
+            if future.done():  # caller went away, the write itself still happened
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
 class SQLiteIdempotencyStore:
-    def __init__(self, conn: aiosqlite.Connection) -> None:
+    def __init__(
+        self,
+        conn: aiosqlite.Connection,
+        insert_batch_window: float = 0.0,
+        insert_batch_size: int = 1,
+        status_flush_window: float = 0.0,
+        status_flush_size: int = 1,
+        readers: ReaderPool | None = None,
+        cache: EventCache | None = None,
+        id_prefix: str = "",
+        lease_duration: float = 60.0,
+    ) -> None:
         self._conn = conn
+        self._id_prefix = id_prefix
+        self._lease_duration = lease_duration
+        self._readers = readers
+        self._cache = cache
+        self._write_lock = asyncio.Lock()
+        self._insert_batcher: WriteBatcher[dict, tuple[Event, bool]] | None = None
+        if insert_batch_window > 0 and insert_batch_size > 1:
+            self._insert_batcher = WriteBatcher(self._insert_many, insert_batch_window, insert_batch_size)
+        self._status_batcher: WriteBatcher[Transition, None] | None = None
+        if status_flush_window > 0 and status_flush_size > 1:
+            self._status_batcher = WriteBatcher(self._flush_transitions, status_flush_window, status_flush_size)
+
+    @asynccontextmanager
+    async def _transaction(self) -> AsyncIterator[None]:
+        # Every write goes through here, so a group commit never has another
+        # coroutine's commit (or rollback) land in the middle of its batch.
+        async with self._write_lock:
+            try:
+                yield
+                await self._conn.commit()
+            except BaseException:
+                await self._conn.rollback()
+                raise
 
     async def insert_or_get(self, request: dict) -> tuple[Event, bool]:
+        if self._cache is not None and (cached := self._cache.get_by_idempotency_key(request["idempotency_key"])):
+            return cached, False
+        if self._insert_batcher is not None:
+            return await self._insert_batcher.submit(request)
+        return (await self._insert_many([request]))[0]
+
+    async def _insert_many(self, requests: list[dict]) -> list[tuple[Event, bool] | Exception]:
+        results: list[tuple[Event, bool] | Exception] = []
+        async with self._transaction():
+            for request in requests:
+                try:
+                    results.append(await self._insert(request))
+                except Exception as e:
+                    results.append(e)
+        # No await between the commit above and this write-through, so no transition
+        # can commit in between and be overwritten by an older row.
+        if self._cache is not None:
+            for result in results:
+                if not isinstance(result, Exception):
+                    self._cache.put(result[0])
+        return results
+
+    async def _insert(self, request: dict) -> tuple[Event, bool]:
+        # One statement, one round trip for both outcomes: on a duplicate key the
+        # no-op DO UPDATE makes RETURNING hand back the existing row instead of
+        # raising IntegrityError and needing a follow-up SELECT. Runs on the writer,
+        # so a duplicate of a row inserted earlier in the same batch is found too.
         now = _now()
-        event_id = str(uuid.uuid4())
-        payload = json.dumps(request["payload"])
-        try:
-            await self._conn.execute(
-                "INSERT INTO events(id,idempotency_key,event_type,payload,status,"
-                "attempts,last_error,retry_after,created_at,updated_at) "
-                "VALUES(?,?,?,?,'pending',0,NULL,NULL,?,?)",
-                (
-                    event_id,
-                    request["idempotency_key"],
-                    request["event_type"],
-                    payload,
-                    now,
-                    now,
-                ),
-            )
-            await self._conn.commit()
-        except aiosqlite.IntegrityError:
-            return await self.get_by_idempotency_key(request["idempotency_key"]), False
-        return await self.get_by_id(event_id), True
+        event_id = f"{self._id_prefix}{uuid.uuid4()}"
+        rows = await self._conn.execute_fetchall(
+            "INSERT INTO events(id,idempotency_key,event_type,payload,status,"
+            "attempts,last_error,retry_after,created_at,updated_at) "
+            "VALUES(?,?,?,?,'pending',0,NULL,NULL,?,?) "
+            "ON CONFLICT(idempotency_key) DO UPDATE SET idempotency_key=excluded.idempotency_key "
+            f"RETURNING {_EVENT_COLUMNS}",
+            (
+                event_id,
+                request["idempotency_key"],
+                request["event_type"],
+                _payload_text(request["payload"]),
+                now,
+                now,
+            ),
+        )
+        (row,) = rows
+        event = _row_to_event(row)
+        return event, event.id == event_id
+
+    @asynccontextmanager
+    async def _reader(self) -> AsyncIterator[aiosqlite.Connection]:
+        if self._readers is None:
+            yield self._conn
+            return
+        async with self._readers.acquire() as conn:
+            yield conn
+
+    async def _fetchone(self, sql: str, params: tuple) -> aiosqlite.Row | None:
+        async with self._reader() as conn, conn.execute(sql, params) as cursor:
+            return await cursor.fetchone()
+
+    async def _fetchall(self, sql: str, params: tuple) -> list[aiosqlite.Row]:
+        async with self._reader() as conn, conn.execute(sql, params) as cursor:
+            return list(await cursor.fetchall())
 
     async def get_by_id(self, event_id: str) -> Event | None:
-        async with self._conn.execute("SELECT * FROM events WHERE id=?", (event_id,)) as cursor:
-            row = await cursor.fetchone()
-        return _row_to_event(row) if row else None
+        if self._cache is not None and (cached := self._cache.get_by_id(event_id)):
+            return cached
+        return await self._load(f"SELECT {_EVENT_COLUMNS} FROM events WHERE id=?", event_id)
 
     async def get_by_idempotency_key(self, key: str) -> Event | None:
-        async with self._conn.execute("SELECT * FROM events WHERE idempotency_key=?", (key,)) as cursor:
-            row = await cursor.fetchone()
-        return _row_to_event(row) if row else None
+        if self._cache is not None and (cached := self._cache.get_by_idempotency_key(key)):
+            return cached
+        return await self._load(f"SELECT {_EVENT_COLUMNS} FROM events WHERE idempotency_key=?", key)
+
+    async def get_payload(self, event_id: str) -> str | None:
+        row = await self._fetchone("SELECT payload FROM events WHERE id=?", (event_id,))
+        return row[0] if row else None
+
+    async def _get_attempts(self, event_id: str) -> int:
+        if self._cache is not None and (cached := self._cache.get_by_id(event_id)):
+            return cached.attempts
+        row = await self._fetchone("SELECT attempts FROM events WHERE id=?", (event_id,))
+        return row[0]
+
+    async def _load(self, sql: str, param: str) -> Event | None:
+        generation = self._cache.generation if self._cache is not None else 0
+        row = await self._fetchone(sql, (param,))
+        if row is None:
+            return None
+        event = _row_to_event(row)
+        # A write-through during the read means the row may already be stale.
+        if self._cache is not None and self._cache.generation == generation:
+            self._cache.put(event)
+        return event
+
+    def _lease_until(self, seconds: float | None = None) -> str:
+        seconds = self._lease_duration if seconds is None else seconds
+        return (datetime.now(UTC) + timedelta(seconds=seconds)).isoformat()
 
     async def mark_processing(self, event_id: str) -> None:
-        await self._conn.execute(
-            "UPDATE events SET status='processing', updated_at=? WHERE id=?",
-            (_now(), event_id),
-        )
-        await self._conn.commit()
+        # Also takes out the lease (`lease_expires_at`) that reap_expired_leases checks.
+        await self._transition(Transition(event_id, "processing"))
+
+    async def extend_lease(self, event_id: str, seconds: float | None = None) -> bool:
+        """Pushes the lease of an in-flight event to `seconds` (default: the
+        store's lease duration) from now. False if it is no longer processing,
+        e.g. because the reaper already took it back."""
+        async with self._transaction():
+            cursor = await self._conn.execute(
+                "UPDATE events SET lease_expires_at=? WHERE id=? AND status='processing'",
+                (self._lease_until(seconds), event_id),
+            )
+        return cursor.rowcount == 1
 
     async def mark_completed(self, event_id: str) -> None:
-        await self._conn.execute(
-            "UPDATE events SET status='completed', updated_at=? WHERE id=?",
-            (_now(), event_id),
-        )
-        await self._conn.commit()
+        await self._transition(Transition(event_id, "completed"))
 
     async def mark_failed(
         self,
@@ -86,38 +309,157 @@ class SQLiteIdempotencyStore:
         max_attempts: int,
         base_delay: float,
         max_delay: float,
-    ) -> None:
-        event = await self.get_by_id(event_id)
-        attempts = event.attempts + 1
-        now = _now()
+    ) -> Transition:
+        """Records the failure and returns it: `status` is 'pending' with a
+        `retry_after` while attempts remain, 'failed' once they are exhausted."""
+        attempts = await self._get_attempts(event_id) + 1
         if attempts < max_attempts:
             delay = min(base_delay * (2**attempts), max_delay)
             retry_after = (datetime.now(UTC) + timedelta(seconds=delay)).isoformat()
-            await self._conn.execute(
-                "UPDATE events SET status='pending', attempts=?, last_error=?, retry_after=?, updated_at=? WHERE id=?",
-                (attempts, error, retry_after, now, event_id),
-            )
+            transition = Transition(event_id, "pending", attempts, error, retry_after)
         else:
+            transition = Transition(event_id, "failed", attempts, error)
+        await self._transition(transition)
+        return transition
+
+    async def _transition(self, transition: Transition) -> None:
+        if self._status_batcher is not None:
+            await self._status_batcher.submit(transition)
+            return
+        now = _now()
+        async with self._transaction():
+            await self._apply_transitions([transition], now)
+        self._write_through([transition], now)
+
+    async def _flush_transitions(self, transitions: list[Transition]) -> list[None]:
+        start = time.monotonic()
+        now = _now()
+        async with self._transaction():
+            await self._apply_transitions(transitions, now)
+        self._write_through(transitions, now)
+        STATUS_FLUSH_DURATION.observe(time.monotonic() - start)
+        STATUS_FLUSH_SIZE.observe(len(transitions))
+        return [None] * len(transitions)
+
+    def _write_through(self, transitions: list[Transition], now: str) -> None:
+        if self._cache is None:
+            return
+        for t in transitions:
+            if t.attempts is None:
+                self._cache.update(t.event_id, status=t.status, updated_at=now)
+            else:
+                self._cache.update(
+                    t.event_id,
+                    status=t.status,
+                    attempts=t.attempts,
+                    last_error=t.last_error,
+                    retry_after=t.retry_after,
+                    updated_at=now,
+                )
+
+    async def _apply_transitions(self, transitions: list[Transition], now: str) -> None:
+        # Plain status changes collapse into one multi-row UPDATE per status; failures
+        # carry per-row attempts/error/retry_after and go through executemany.
+        by_status: dict[str, list[str]] = {}
+        failures = []
+        for t in transitions:
+            if t.attempts is None:
+                by_status.setdefault(t.status, []).append(t.event_id)
+            else:
+                failures.append((t.status, t.attempts, t.last_error, t.retry_after, now, t.event_id))
+        for status, ids in by_status.items():
+            lease = self._lease_until() if status == "processing" else None
             await self._conn.execute(
-                "UPDATE events SET status='failed', attempts=?, last_error=?, updated_at=? WHERE id=?",
-                (attempts, error, now, event_id),
+                "UPDATE events SET status=?, updated_at=?, lease_expires_at=?"
+                f" WHERE id IN ({','.join('?' * len(ids))})",
+                (status, now, lease, *ids),
+            )
+        if failures:
+            await self._conn.executemany(
+                "UPDATE events SET status=?, attempts=?, last_error=?, retry_after=?, updated_at=?,"
+                " claimed_by=NULL, lease_expires_at=NULL WHERE id=?",
+                failures,
+            )
+
+    async def claim(self, owner: str, limit: int) -> list[str]:
+        """Atomically moves up to `limit` due pending events to 'processing' under
+        `owner` and returns their ids. One statement on the writer, so concurrent
+        claimers — other processes included — never get the same row."""
+        now = _now()
+        async with self._transaction():
+            rows = await self._conn.execute_fetchall(
+                "UPDATE events SET status='processing', claimed_by=?, lease_expires_at=?, updated_at=? WHERE id IN ("
+                "SELECT id FROM events WHERE status='pending' AND (retry_after IS NULL OR retry_after <= ?)"
+                " ORDER BY created_at LIMIT ?) RETURNING id",
+                (owner, self._lease_until(), now, now, limit),
             )
-        await self._conn.commit()
+        ids = [row[0] for row in rows]
+        if self._cache is not None:
+            for event_id in ids:
+                self._cache.update(event_id, status="processing", updated_at=now)
+        return ids
 
-    async def get_pending_ids(self, now: str) -> list[str]:
-        async with self._conn.execute(
-            "SELECT id FROM events WHERE status IN ('pending','processing')"
-            " AND (retry_after IS NULL OR retry_after <= ?)"
-            " ORDER BY created_at",
+    async def reap_expired_leases(self, now: str) -> list[str]:
+        """Puts events whose lease ran out before `now` back to 'pending' and returns
+        their ids. Served by the partial index idx_events_processing_lease, so its
+        cost depends on the number of in-flight rows, not on the table size."""
+        async with self._transaction():
+            rows = await self._conn.execute_fetchall(
+                "UPDATE events SET status='pending', claimed_by=NULL, lease_expires_at=NULL, updated_at=?"
+                " WHERE status='processing' AND lease_expires_at < ? RETURNING id",
+                (now, now),
+            )
+        ids = [row[0] for row in rows]
+        if self._cache is not None:
+            for event_id in ids:
+                self._cache.update(event_id, status="pending", updated_at=now)
+        return ids
+
+    async def count_ready(self, now: str) -> int:
+        row = await self._fetchone(
+            "SELECT count(*) FROM events WHERE status='pending' AND (retry_after IS NULL OR retry_after <= ?)",
             (now,),
-        ) as cursor:
-            rows = await cursor.fetchall()
-        return [row[0] for row in rows]
+        )
+        return row[0]
 
-    async def delete_expired(self, before: str) -> int:
-        cursor = await self._conn.execute(
-            "DELETE FROM events WHERE status IN ('completed','failed') AND created_at < ?",
-            (before,),
+    async def count_pending(self, now: str) -> int:
+        row = await self._fetchone(
+            "SELECT count(*) FROM events WHERE status='pending' AND created_at <= ? AND updated_at <= ?"
+            " AND (retry_after IS NULL OR retry_after <= ?)",
+            (now, now, now),
         )
-        await self._conn.commit()
+        return row[0]
+
+    async def iter_pending_ids(self, now: str, chunk_size: int) -> AsyncIterator[list[str]]:
+        # Keyset pagination over idx_events_status_created_at, with rowid as the
+        # tie-breaker. Rows written after recovery started are left out: ingest
+        # enqueues new events and the lease reaper enqueues what it takes back.
+        # 'processing' rows are the reaper's too, once their lease runs out.
+        last = ("", 0)
+        while rows := await self._fetchall(
+            "SELECT id, created_at, rowid FROM events WHERE status='pending' AND created_at <= ?"
+            " AND updated_at <= ? AND (created_at, rowid) > (?, ?) AND (retry_after IS NULL OR retry_after <= ?)"
+            " ORDER BY created_at, rowid LIMIT ?",
+            (now, now, *last, now, chunk_size),
+        ):
+            yield [row[0] for row in rows]
+            last = (rows[-1][1], rows[-1][2])
+
+    async def get_scheduled_retries(self, now: str) -> list[tuple[str, str]]:
+        return [
+            (row[0], row[1])
+            for row in await self._fetchall(
+                "SELECT id, retry_after FROM events WHERE status='pending' AND retry_after > ?",
+                (now,),
+            )
+        ]
+
+    async def delete_expired(self, before: str) -> int:
+        async with self._transaction():
+            cursor = await self._conn.execute(
+                "DELETE FROM events WHERE status IN ('completed','failed') AND created_at < ?",
+                (before,),
+            )
+        if self._cache is not None:
+            self._cache.discard_if(lambda e: e.status in ("completed", "failed") and e.created_at < before)
         return cursor.rowcount
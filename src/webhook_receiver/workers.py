@@ -6,17 +6,26 @@ from datetime import UTC, datetime
 
 from webhook_receiver.config import Settings
 from webhook_receiver.metrics import (
+    LEASES_EXPIRED_TOTAL,
     PROCESSING_DURATION,
     PROCESSING_ERRORS_TOTAL,
-    QUEUE_DEPTH,
+    RECOVERY_REMAINING,
 )
 from webhook_receiver.queue import EventQueue
-from webhook_receiver.store import SQLiteIdempotencyStore
+from webhook_receiver.scheduler import RetryScheduler
+from webhook_receiver.store import IdempotencyStore
 
 logger = logging.getLogger(__name__)
 
+RECOVERY_FULL_QUEUE_WAIT = 0.05
 
-async def process_event(event_id: str, store: SQLiteIdempotencyStore, settings: Settings) -> None:
+
+async def process_event(
+    event_id: str,
+    store: IdempotencyStore,
+    settings: Settings,
+    scheduler: RetryScheduler | None = None,
+) -> None:
     logger.info("Processing event %s", event_id)
     await store.mark_processing(event_id)
     start = time.monotonic()
@@ -26,30 +35,70 @@ async def process_event(event_id: str, store: SQLiteIdempotencyStore, settings:
         logger.info("Completed event %s", event_id)
     except Exception as e:
         PROCESSING_ERRORS_TOTAL.inc()
-        await store.mark_failed(
+        failure = await store.mark_failed(
             event_id,
             str(e),
             settings.max_attempts,
             settings.retry_base_delay,
             settings.retry_max_delay,
         )
-        event = await store.get_by_id(event_id)
-        if event.status == "failed":
+        if failure.status == "failed":
             logger.error("Dead-letter event %s error=%s", event_id, e)
         else:
-            logger.info("Retry scheduled event %s attempts=%s", event_id, event.attempts)
+            logger.info("Retry scheduled event %s attempts=%s", event_id, failure.attempts)
+            if scheduler is not None:
+                scheduler.schedule(event_id, failure.retry_after)
     finally:
         PROCESSING_DURATION.observe(time.monotonic() - start)
 
 
-async def worker(queue: EventQueue, store: SQLiteIdempotencyStore, settings: Settings) -> None:
+async def worker(
+    queue: EventQueue,
+    store: IdempotencyStore,
+    settings: Settings,
+    scheduler: RetryScheduler | None = None,
+) -> None:
     while True:
         event_id = await queue.get()
-        QUEUE_DEPTH.set(queue.qsize())
-        await process_event(event_id, store, settings)
+        await process_event(event_id, store, settings, scheduler)
 
 
-async def load_pending(queue: EventQueue, store: SQLiteIdempotencyStore) -> None:
+async def load_pending(
+    queue: EventQueue,
+    store: IdempotencyStore,
+    scheduler: RetryScheduler | None = None,
+    chunk_size: int = 500,
+) -> None:
+    # Runs in the background after startup: streams pending rows chunk by chunk and
+    # only tops the queue up while it is below maxsize. One `now` for all queries:
+    # every pending row is either due (queue) or not yet due (scheduler).
     now = datetime.now(UTC).isoformat()
-    for event_id in await store.get_pending_ids(now):
-        await queue.put(event_id)
+    if scheduler is not None:
+        for event_id, retry_after in await store.get_scheduled_retries(now):
+            scheduler.schedule(event_id, retry_after)
+    # inc/dec rather than set: with shards, one recovery per shard runs concurrently.
+    remaining = await store.count_pending(now)
+    RECOVERY_REMAINING.inc(remaining)
+    async for chunk in store.iter_pending_ids(now, chunk_size):
+        for event_id in chunk:
+            while queue.full():
+                await asyncio.sleep(RECOVERY_FULL_QUEUE_WAIT)
+            await queue.put(event_id)
+        done = min(len(chunk), remaining)
+        remaining -= done
+        RECOVERY_REMAINING.dec(done)
+    RECOVERY_REMAINING.dec(remaining)
+    logger.info("Recovery enqueued all pending events")
+
+
+async def reap_leases(queue: EventQueue, store: IdempotencyStore, interval: float) -> None:
+    # Takes back events whose worker stalled or whose process died mid-processing;
+    # a stalled worker that finishes later only repeats an at-least-once delivery.
+    while True:
+        event_ids = await store.reap_expired_leases(datetime.now(UTC).isoformat())
+        for event_id in event_ids:
+            await queue.put(event_id)
+        if event_ids:
+            LEASES_EXPIRED_TOTAL.inc(len(event_ids))
+            logger.warning("Lease expired, re-enqueued %d events", len(event_ids))
+        await asyncio.sleep(interval)
@@ -4,8 +4,9 @@ from httpx import ASGITransport, AsyncClient
 from webhook_receiver.app import create_app
 from webhook_receiver.config import Settings
 from webhook_receiver.database import open_db
-from webhook_receiver.dependencies import get_db, get_queue
+from webhook_receiver.dependencies import get_queue, get_store
 from webhook_receiver.queue import AsyncioEventQueue
+from webhook_receiver.store import SQLiteIdempotencyStore
 
 
 @pytest.fixture
@@ -22,7 +23,8 @@ async def client(tmp_path: pytest.TempPathFactory) -> AsyncClient:
     db = await open_db(settings.db_path)
     queue = AsyncioEventQueue(maxsize=settings.queue_maxsize)
     app.state.ready = True
-    app.dependency_overrides[get_db] = lambda: db
+    store = SQLiteIdempotencyStore(db)
+    app.dependency_overrides[get_store] = lambda: store
     app.dependency_overrides[get_queue] = lambda: queue
     async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as c:
         yield c
@@ -4,8 +4,9 @@ from httpx import ASGITransport, AsyncClient
 from webhook_receiver.app import create_app
 from webhook_receiver.config import Settings
 from webhook_receiver.database import open_db
-from webhook_receiver.dependencies import get_db, get_queue
+from webhook_receiver.dependencies import get_queue, get_store
 from webhook_receiver.queue import AsyncioEventQueue
+from webhook_receiver.store import SQLiteIdempotencyStore
 
 WEBHOOK = {
     "idempotency_key": "evt-001",
@@ -85,7 +86,8 @@ async def full_queue_client(tmp_path: pytest.TempPathFactory) -> AsyncClient:
     queue = AsyncioEventQueue(maxsize=1)
     await queue.put("blocker")
     app.state.ready = True
-    app.dependency_overrides[get_db] = lambda: db
+    store = SQLiteIdempotencyStore(db)
+    app.dependency_overrides[get_store] = lambda: store
     app.dependency_overrides[get_queue] = lambda: queue
     async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as c:
         yield c
@@ -106,9 +108,37 @@ async def test_ready_returns_503_when_not_ready(
     app = create_app(settings)
     db = await open_db(settings.db_path)
     app.state.ready = False
-    app.dependency_overrides[get_db] = lambda: db
+    store = SQLiteIdempotencyStore(db)
+    app.dependency_overrides[get_store] = lambda: store
     app.dependency_overrides[get_queue] = lambda: AsyncioEventQueue(maxsize=10)
     async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as c:
         response = await c.get("/ready")
     await db.close()
     assert response.status_code == 503
+
+
+async def test_post_webhook_stores_payload_verbatim(tmp_path: pytest.TempPathFactory) -> None:
+    settings = Settings(db_path=str(tmp_path / "test.db"))
+    app = create_app(settings)
+    db = await open_db(settings.db_path)
+    store = SQLiteIdempotencyStore(db)
+    app.dependency_overrides[get_store] = lambda: store
+    app.dependency_overrides[get_queue] = lambda: AsyncioEventQueue(maxsize=10)
+    raw = b'{"idempotency_key": "evt-raw", "event_type": "t", "payload": {"amount": 1.50, "tags": [ ]}}'
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as c:
+        response = await c.post("/webhooks", content=raw, headers={"content-type": "application/json"})
+    payload = await store.get_payload(response.json()["id"])
+    await db.close()
+    assert payload == '{"amount": 1.50, "tags": [ ]}'
+
+
+async def test_post_webhook_invalid_body_returns_422(client: AsyncClient) -> None:
+    response = await client.post("/webhooks", json={"idempotency_key": "evt-1", "payload": {}})
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["body", "event_type"]
+
+
+async def test_openapi_documents_webhook_body(client: AsyncClient) -> None:
+    schema = (await client.get("/openapi.json")).json()
+    body = schema["paths"]["/webhooks"]["post"]["requestBody"]["content"]["application/json"]["schema"]
+    assert set(body["required"]) == {"idempotency_key", "event_type", "payload"}
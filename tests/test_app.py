@@ -0,0 +1,53 @@
+import asyncio
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from webhook_receiver.app import create_app
+from webhook_receiver.config import Settings
+
+WEBHOOK = {
+    "idempotency_key": "evt-001",
+    "event_type": "order.created",
+    "payload": {"order_id": "ORD-1234"},
+}
+
+
+async def test_lifespan_wires_store_and_queue(tmp_path: pytest.TempPathFactory) -> None:
+    settings = Settings(db_path=str(tmp_path / "test.db"), worker_count=2)
+    app = create_app(settings)
+    async with app.router.lifespan_context(app):
+        assert app.state.ready is True
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as c:
+            created = await c.post("/webhooks", json=WEBHOOK)
+            fetched = await c.get(f"/webhooks/{created.json()['id']}")
+    assert created.status_code == 202
+    assert fetched.status_code == 200
+
+
+async def test_lifespan_with_shards(tmp_path: pytest.TempPathFactory) -> None:
+    settings = Settings(db_path=str(tmp_path / "test.db"), worker_count=1, shard_count=2)
+    app = create_app(settings)
+    async with app.router.lifespan_context(app):
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as c:
+            created = [await c.post("/webhooks", json=WEBHOOK | {"idempotency_key": f"k-{i}"}) for i in range(4)]
+            fetched = await c.get(f"/webhooks/{created[0].json()['id']}")
+    assert {r.json()["id"].partition(".")[0] for r in created} <= {"0", "1"}
+    assert fetched.status_code == 200
+    assert (tmp_path / "test.0.db").exists()
+    assert (tmp_path / "test.1.db").exists()
+
+
+async def test_lifespan_with_sqlite_queue(tmp_path: pytest.TempPathFactory) -> None:
+    settings = Settings(db_path=str(tmp_path / "test.db"), worker_count=1, queue_backend="sqlite")
+    app = create_app(settings)
+    async with app.router.lifespan_context(app):
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as c:
+            created = await c.post("/webhooks", json=WEBHOOK)
+            for _ in range(100):
+                if (await c.get(f"/webhooks/{created.json()['id']}")).json()["status"] == "processing":
+                    break
+                await asyncio.sleep(0.01)
+            fetched = await c.get(f"/webhooks/{created.json()['id']}")
+    assert created.status_code == 202
+    assert fetched.json()["status"] == "processing"
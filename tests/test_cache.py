@@ -0,0 +1,77 @@
+from unittest.mock import patch
+
+from prometheus_client import REGISTRY
+
+from webhook_receiver.cache import EventCache
+from webhook_receiver.store import Event
+
+
+def _event(event_id: str, status: str = "pending", created_at: str = "2026-01-01T00:00:00+00:00") -> Event:
+    return Event(event_id, f"key-{event_id}", "test", status, 0, None, None, created_at, created_at)
+
+
+def _sample(name: str, **labels: str) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_get_by_id_and_key_hit() -> None:
+    cache = EventCache(max_size=10, ttl=60)
+    cache.put(_event("a"))
+    assert cache.get_by_id("a").id == "a"
+    assert cache.get_by_idempotency_key("key-a").id == "a"
+
+
+def test_miss_is_counted() -> None:
+    cache = EventCache(max_size=10, ttl=60)
+    before = _sample("webhook_cache_misses_total")
+    assert cache.get_by_id("missing") is None
+    assert cache.get_by_idempotency_key("missing") is None
+    assert _sample("webhook_cache_misses_total") == before + 2
+
+
+def test_least_recently_used_is_evicted() -> None:
+    cache = EventCache(max_size=2, ttl=60)
+    before = _sample("webhook_cache_evictions_total", reason="size")
+    cache.put(_event("a"))
+    cache.put(_event("b"))
+    cache.get_by_id("a")
+    cache.put(_event("c"))
+    assert cache.get_by_id("b") is None
+    assert cache.get_by_idempotency_key("key-b") is None
+    assert cache.get_by_id("a") is not None
+    assert _sample("webhook_cache_evictions_total", reason="size") == before + 1
+
+
+def test_expired_entry_is_evicted() -> None:
+    cache = EventCache(max_size=10, ttl=60)
+    with patch("webhook_receiver.cache.time.monotonic", return_value=0.0):
+        cache.put(_event("a"))
+    with patch("webhook_receiver.cache.time.monotonic", return_value=61.0):
+        assert cache.get_by_id("a") is None
+    assert cache.get_by_idempotency_key("key-a") is None
+
+
+def test_update_replaces_instead_of_mutating() -> None:
+    cache = EventCache(max_size=10, ttl=60)
+    original = _event("a")
+    cache.put(original)
+    cache.update("a", status="completed")
+    assert cache.get_by_id("a").status == "completed"
+    assert original.status == "pending"
+
+
+def test_update_of_uncached_event_only_bumps_generation() -> None:
+    cache = EventCache(max_size=10, ttl=60)
+    generation = cache.generation
+    cache.update("missing", status="completed")
+    assert cache.generation > generation
+    assert cache.get_by_id("missing") is None
+
+
+def test_discard_if() -> None:
+    cache = EventCache(max_size=10, ttl=60)
+    cache.put(_event("a", status="completed"))
+    cache.put(_event("b", status="pending"))
+    cache.discard_if(lambda e: e.status == "completed")
+    assert cache.get_by_id("a") is None
+    assert cache.get_by_id("b") is not None
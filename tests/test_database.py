@@ -1,6 +1,7 @@
+import aiosqlite
 import pytest
 
-from webhook_receiver.database import open_db
+from webhook_receiver.database import _MIGRATIONS, open_db, open_reader_pool
 
 
 async def test_events_table_created(tmp_path: pytest.TempPathFactory) -> None:
@@ -29,3 +30,42 @@ async def test_index_created(tmp_path: pytest.TempPathFactory) -> None:
         row = await cursor.fetchone()
     await conn.close()
     assert row is not None
+
+
+async def test_reader_pool_connections_are_read_only(tmp_path: pytest.TempPathFactory) -> None:
+    db_path = str(tmp_path / "test.db")
+    writer = await open_db(db_path)
+    pool = await open_reader_pool(db_path, size=2)
+    async with pool.acquire() as conn:
+        with pytest.raises(aiosqlite.OperationalError, match="readonly"):
+            await conn.execute("DELETE FROM events")
+    await pool.close()
+    await writer.close()
+
+
+async def test_reader_pool_sees_committed_writes(tmp_path: pytest.TempPathFactory) -> None:
+    db_path = str(tmp_path / "test.db")
+    writer = await open_db(db_path)
+    pool = await open_reader_pool(db_path, size=1)
+    await writer.execute(
+        "INSERT INTO events(id,idempotency_key,event_type,payload,created_at,updated_at)"
+        " VALUES('a','a','t','{}','x','x')"
+    )
+    await writer.commit()
+    async with pool.acquire() as conn, conn.execute("SELECT count(*) FROM events") as cursor:
+        row = await cursor.fetchone()
+    await pool.close()
+    await writer.close()
+    assert row[0] == 1
+
+
+async def test_migrations_run_once(tmp_path: pytest.TempPathFactory) -> None:
+    db_path = str(tmp_path / "test.db")
+    await (await open_db(db_path)).close()
+    conn = await open_db(db_path)
+    async with conn.execute("PRAGMA user_version") as cursor:
+        (version,) = await cursor.fetchone()
+    columns = [row[1] for row in await conn.execute_fetchall("PRAGMA table_info(events)")]
+    await conn.close()
+    assert version == len(_MIGRATIONS)
+    assert "claimed_by" in columns
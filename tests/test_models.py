@@ -0,0 +1,62 @@
+import json
+
+import pytest
+from fastapi.exceptions import RequestValidationError
+
+from webhook_receiver.models import (
+    EventStatusResponse,
+    WebhookResponse,
+    parse_webhook_request,
+    render_event_status,
+    render_webhook_response,
+)
+from webhook_receiver.store import Event
+
+
+def test_parse_keeps_payload_text_verbatim() -> None:
+    raw = b'{ "idempotency_key": "k-1", "event_type": "order.created",\n "payload": {"b": 1,  "a": [1.50, "\\u00e9"]} }'
+    assert parse_webhook_request(raw) == {
+        "idempotency_key": "k-1",
+        "event_type": "order.created",
+        "payload": '{"b": 1,  "a": [1.50, "\\u00e9"]}',
+    }
+
+
+def test_parse_accepts_any_key_order_and_extra_fields() -> None:
+    raw = b'{"payload":{},"extra":[1,{"x":null}],"event_type":"t","idempotency_key":"k"}'
+    assert parse_webhook_request(raw)["payload"] == "{}"
+
+
+@pytest.mark.parametrize(
+    ("raw", "error_type", "loc"),
+    [
+        (b'{"event_type": "t", "payload": {}}', "missing", ("body", "idempotency_key")),
+        (b'{"idempotency_key": 1, "event_type": "t", "payload": {}}', "string_type", ("body", "idempotency_key")),
+        (b'{"idempotency_key": "k", "event_type": null, "payload": {}}', "string_type", ("body", "event_type")),
+        (b'{"idempotency_key": "k", "event_type": "t", "payload": []}', "dict_type", ("body", "payload")),
+        (b'{"idempotency_key": "k", "event_type": "t"', "json_invalid", ("body",)),
+        (b'{"idempotency_key": "k"} trailing', "json_invalid", ("body",)),
+        (b'["not", "an", "object"]', "json_invalid", ("body",)),
+        (b"{}", "missing", ("body", "idempotency_key")),
+        (b"\xff", "json_invalid", ("body",)),
+    ],
+)
+def test_parse_rejects_invalid_bodies(raw: bytes, error_type: str, loc: tuple) -> None:
+    with pytest.raises(RequestValidationError) as exc_info:
+        parse_webhook_request(raw)
+    assert exc_info.value.errors()[0]["type"] == error_type
+    assert exc_info.value.errors()[0]["loc"] == loc
+
+
+def test_render_matches_webhook_response() -> None:
+    event = Event("id-1", 'key "ż"', "t", "pending", 0, None, None, "2026-01-01T00:00:00+00:00", "x")
+    expected = WebhookResponse(id="id-1", idempotency_key='key "ż"', status="pending", created_at=event.created_at)
+    assert json.loads(render_webhook_response(event)) == expected.model_dump()
+
+
+def test_render_event_status_matches_event_status_response() -> None:
+    event = Event("id-1", "k\n", "t", "completed", 2, "boom", None, "2026-01-01T00:00:00+00:00", "2026-01-02")
+    expected = EventStatusResponse(
+        id="id-1", idempotency_key="k\n", status="completed", created_at=event.created_at, updated_at="2026-01-02"
+    )
+    assert json.loads(render_event_status(event)) == expected.model_dump()
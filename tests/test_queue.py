@@ -1,4 +1,11 @@
-from webhook_receiver.queue import AsyncioEventQueue
+import asyncio
+
+import aiosqlite
+import pytest
+
+from webhook_receiver.database import open_db
+from webhook_receiver.queue import AsyncioEventQueue, SQLiteEventQueue
+from webhook_receiver.store import SQLiteIdempotencyStore
 
 
 async def test_put_and_get() -> None:
@@ -22,10 +29,77 @@ async def test_full() -> None:
 
 async def test_put_beyond_maxsize_succeeds() -> None:
     # maxsize is a soft limit checked only by the router via full().
-    # put() must never raise — startup load_pending must be able to enqueue
-    # all pending events regardless of the configured queue capacity.
+    # put() must never raise — the retry scheduler and startup recovery must be
+    # able to enqueue events regardless of the configured queue capacity.
     q = AsyncioEventQueue(maxsize=1)
     await q.put("evt-001")
     assert q.full() is True
     await q.put("evt-002")  # must not raise
     assert q.qsize() == 2
+
+
+async def test_route_is_the_queue_itself() -> None:
+    q = AsyncioEventQueue(maxsize=1)
+    assert q.route("evt-001") is q
+
+
+def _sqlite_queue(store: SQLiteIdempotencyStore, owner: str, **kwargs) -> SQLiteEventQueue:
+    options = {"maxsize": 10, "claim_batch": 2, "poll_interval": 0.01} | kwargs
+    return SQLiteEventQueue(store, owner, **options)
+
+
+async def _insert(store: SQLiteIdempotencyStore, count: int) -> list[str]:
+    requests = [{"idempotency_key": f"k-{i}", "event_type": "t", "payload": {}} for i in range(count)]
+    return [(await store.insert_or_get(request))[0].id for request in requests]
+
+
+async def test_sqlite_queue_claims_pending_rows(db: aiosqlite.Connection) -> None:
+    store = SQLiteIdempotencyStore(db)
+    ids = await _insert(store, 3)
+    q = _sqlite_queue(store, "p1")
+    assert [await q.get() for _ in range(3)] == ids
+    rows = await db.execute_fetchall("SELECT DISTINCT status, claimed_by FROM events")
+    assert [tuple(row) for row in rows] == [("processing", "p1")]
+
+
+async def test_sqlite_queue_never_hands_a_row_to_two_processes(tmp_path: pytest.TempPathFactory) -> None:
+    conns = [await open_db(str(tmp_path / "shared.db")) for _ in range(2)]
+    stores = [SQLiteIdempotencyStore(conn) for conn in conns]
+    ids = await _insert(stores[0], 20)
+    queues = [_sqlite_queue(store, f"p{i}") for i, store in enumerate(stores)]
+    claimed = await asyncio.gather(*(queues[i % 2].get() for i in range(20)))
+    for conn in conns:
+        await conn.close()
+    assert sorted(claimed) == sorted(ids)
+
+
+async def test_sqlite_queue_waits_for_put(db: aiosqlite.Connection) -> None:
+    store = SQLiteIdempotencyStore(db)
+    q = _sqlite_queue(store, "p1", poll_interval=60)
+    consumer = asyncio.create_task(q.get())
+    await asyncio.sleep(0.01)
+    (event_id,) = await _insert(store, 1)
+    await q.put(event_id)
+    assert await asyncio.wait_for(consumer, 1) == event_id
+
+
+async def test_sqlite_queue_skips_retries_until_due(db: aiosqlite.Connection) -> None:
+    store = SQLiteIdempotencyStore(db)
+    (event_id,) = await _insert(store, 1)
+    await store.mark_failed(event_id, "boom", 5, 60.0, 60.0)
+    q = _sqlite_queue(store, "p1")
+    with pytest.raises(TimeoutError):
+        await asyncio.wait_for(q.get(), 0.05)
+    await db.execute("UPDATE events SET retry_after=NULL")
+    await db.commit()
+    assert await asyncio.wait_for(q.get(), 1) == event_id
+
+
+async def test_sqlite_queue_full_counts_the_database(db: aiosqlite.Connection) -> None:
+    store = SQLiteIdempotencyStore(db)
+    await _insert(store, 2)
+    q = _sqlite_queue(store, "p1", maxsize=2, claim_batch=1)
+    await q._refresh_depth()
+    assert q.full() is True
+    await q.get()
+    assert q.full() is False
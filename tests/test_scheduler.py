@@ -0,0 +1,52 @@
+import asyncio
+from datetime import UTC, datetime, timedelta
+
+from webhook_receiver.queue import AsyncioEventQueue
+from webhook_receiver.scheduler import RetryScheduler
+
+
+def _in(seconds: float) -> str:
+    return (datetime.now(UTC) + timedelta(seconds=seconds)).isoformat()
+
+
+async def test_due_retry_is_enqueued() -> None:
+    queue = AsyncioEventQueue(maxsize=10)
+    scheduler = RetryScheduler(queue)
+    scheduler.schedule("evt-1", _in(-1))
+    task = asyncio.create_task(scheduler.run())
+    assert await asyncio.wait_for(queue.get(), 1) == "evt-1"
+    assert len(scheduler) == 0
+    task.cancel()
+
+
+async def test_future_retry_waits_for_retry_after() -> None:
+    queue = AsyncioEventQueue(maxsize=10)
+    scheduler = RetryScheduler(queue)
+    scheduler.schedule("later", _in(60))
+    task = asyncio.create_task(scheduler.run())
+    await asyncio.sleep(0.05)
+    assert queue.qsize() == 0
+    assert len(scheduler) == 1
+    task.cancel()
+
+
+async def test_earlier_retry_wakes_sleeping_scheduler() -> None:
+    queue = AsyncioEventQueue(maxsize=10)
+    scheduler = RetryScheduler(queue)
+    scheduler.schedule("later", _in(60))
+    task = asyncio.create_task(scheduler.run())
+    await asyncio.sleep(0.01)
+    scheduler.schedule("sooner", _in(0.05))
+    assert await asyncio.wait_for(queue.get(), 1) == "sooner"
+    assert len(scheduler) == 1
+    task.cancel()
+
+
+async def test_retries_are_released_in_due_order() -> None:
+    queue = AsyncioEventQueue(maxsize=10)
+    scheduler = RetryScheduler(queue)
+    for event_id, delay in [("c", -1), ("a", -3), ("b", -2)]:
+        scheduler.schedule(event_id, _in(delay))
+    task = asyncio.create_task(scheduler.run())
+    assert [await asyncio.wait_for(queue.get(), 1) for _ in range(3)] == ["a", "b", "c"]
+    task.cancel()
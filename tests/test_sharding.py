@@ -0,0 +1,92 @@
+import aiosqlite
+import pytest
+
+from webhook_receiver.database import open_db
+from webhook_receiver.queue import AsyncioEventQueue
+from webhook_receiver.sharding import (
+    ShardedEventQueue,
+    ShardedIdempotencyStore,
+    shard_for_id,
+    shard_for_key,
+    shard_id_prefix,
+    shard_paths,
+)
+from webhook_receiver.store import SQLiteIdempotencyStore
+
+REQUEST = {"event_type": "order.created", "payload": {}}
+
+
+@pytest.fixture
+async def conns(tmp_path: pytest.TempPathFactory):
+    conns = [await open_db(path) for path in shard_paths(str(tmp_path / "events.db"), 3)]
+    yield conns
+    for conn in conns:
+        await conn.close()
+
+
+@pytest.fixture
+def store(conns: list[aiosqlite.Connection]) -> ShardedIdempotencyStore:
+    return ShardedIdempotencyStore(
+        [SQLiteIdempotencyStore(conn, id_prefix=shard_id_prefix(i)) for i, conn in enumerate(conns)]
+    )
+
+
+def test_shard_paths() -> None:
+    assert shard_paths("/data/events.db", 1) == ["/data/events.db"]
+    assert shard_paths("/data/events.db", 2) == ["/data/events.0.db", "/data/events.1.db"]
+
+
+def test_shard_for_id() -> None:
+    assert shard_for_id("2.0b4e", 3) == 2
+    assert shard_for_id("3.0b4e", 3) is None
+    assert shard_for_id("0b4e-11", 3) is None
+
+
+async def test_events_land_on_the_shard_of_their_key(
+    store: ShardedIdempotencyStore, conns: list[aiosqlite.Connection]
+) -> None:
+    for i in range(12):
+        event, _ = await store.insert_or_get(REQUEST | {"idempotency_key": f"k-{i}"})
+        index = shard_for_key(f"k-{i}", 3)
+        assert shard_for_id(event.id, 3) == index
+        assert await conns[index].execute_fetchall("SELECT 1 FROM events WHERE id=?", (event.id,))
+
+
+async def test_duplicates_are_exact_across_shards(store: ShardedIdempotencyStore) -> None:
+    first, first_new = await store.insert_or_get(REQUEST | {"idempotency_key": "k"})
+    second, second_new = await store.insert_or_get(REQUEST | {"idempotency_key": "k"})
+    assert (first_new, second_new) == (True, False)
+    assert second.id == first.id
+    assert (await store.get_by_idempotency_key("k")).id == first.id
+
+
+async def test_lookups_and_transitions_route_by_id(store: ShardedIdempotencyStore) -> None:
+    event, _ = await store.insert_or_get(REQUEST | {"idempotency_key": "k"})
+    await store.mark_processing(event.id)
+    failure = await store.mark_failed(event.id, "boom", 1, 1.0, 1.0)
+    assert failure.status == "failed"
+    assert (await store.get_by_id(event.id)).status == "failed"
+    assert await store.get_payload(event.id) == "{}"
+    assert await store.get_by_id("9.missing") is None
+    with pytest.raises(KeyError):
+        await store.mark_completed("9.missing")
+
+
+async def test_recovery_and_cleanup_cover_every_shard(store: ShardedIdempotencyStore) -> None:
+    ids = {(await store.insert_or_get(REQUEST | {"idempotency_key": f"k-{i}"}))[0].id for i in range(6)}
+    now = "9999-01-01T00:00:00+00:00"
+    assert await store.count_pending(now) == 6
+    assert {event_id async for chunk in store.iter_pending_ids(now, 2) for event_id in chunk} == ids
+    for event_id in ids:
+        await store.mark_completed(event_id)
+    assert await store.delete_expired(now) == 6
+
+
+async def test_sharded_queue_routes_by_id() -> None:
+    shards = [AsyncioEventQueue(maxsize=1), AsyncioEventQueue(maxsize=1)]
+    queue = ShardedEventQueue(shards)
+    await queue.put("1.a")
+    assert (shards[0].qsize(), shards[1].qsize(), queue.qsize()) == (0, 1, 1)
+    assert queue.route("1.b").full() is True
+    assert queue.route("0.b").full() is False
+    assert queue.full() is False
@@ -0,0 +1,211 @@
+import asyncio
+from unittest.mock import patch
+
+import aiosqlite
+import pytest
+from prometheus_client import REGISTRY
+
+from webhook_receiver.cache import EventCache
+from webhook_receiver.database import open_db, open_reader_pool
+from webhook_receiver.store import SQLiteIdempotencyStore
+
+
+def _request(key: str) -> dict:
+    return {"idempotency_key": key, "event_type": "order.created", "payload": {"key": key}}
+
+
+async def test_insert_or_get_new_then_duplicate(db: aiosqlite.Connection) -> None:
+    store = SQLiteIdempotencyStore(db)
+    first, first_new = await store.insert_or_get(_request("k-1"))
+    second, second_new = await store.insert_or_get(_request("k-1"))
+    assert first_new is True
+    assert second_new is False
+    assert second.id == first.id
+
+
+async def test_group_commit_resolves_each_caller(db: aiosqlite.Connection) -> None:
+    store = SQLiteIdempotencyStore(db, insert_batch_window=0.01, insert_batch_size=100)
+    keys = ["k-1", "k-2", "k-1", "k-3"]
+    results = await asyncio.gather(*(store.insert_or_get(_request(k)) for k in keys))
+    assert [is_new for _, is_new in results] == [True, True, False, True]
+    assert results[2][0].id == results[0][0].id
+    assert [event.idempotency_key for event, _ in results] == keys
+
+
+async def test_group_commit_uses_one_commit_per_batch(db: aiosqlite.Connection) -> None:
+    store = SQLiteIdempotencyStore(db, insert_batch_window=0.01, insert_batch_size=100)
+    with patch.object(db, "commit", wraps=db.commit) as commit:
+        await asyncio.gather(*(store.insert_or_get(_request(f"k-{i}")) for i in range(20)))
+    assert commit.await_count == 1
+    assert await store.get_by_idempotency_key("k-19") is not None
+
+
+async def test_group_commit_flushes_when_batch_is_full(db: aiosqlite.Connection) -> None:
+    store = SQLiteIdempotencyStore(db, insert_batch_window=60.0, insert_batch_size=2)
+    results = await asyncio.gather(store.insert_or_get(_request("k-1")), store.insert_or_get(_request("k-2")))
+    assert all(is_new for _, is_new in results)
+
+
+async def test_group_commit_isolates_bad_rows(db: aiosqlite.Connection) -> None:
+    store = SQLiteIdempotencyStore(db, insert_batch_window=0.01, insert_batch_size=100)
+    good, bad = await asyncio.gather(
+        store.insert_or_get(_request("k-1")),
+        store.insert_or_get({"idempotency_key": "k-2"}),
+        return_exceptions=True,
+    )
+    assert good[1] is True
+    assert isinstance(bad, KeyError)
+    assert await store.get_by_idempotency_key("k-1") is not None
+
+
+async def test_group_commit_fails_whole_batch_on_commit_error(db: aiosqlite.Connection) -> None:
+    store = SQLiteIdempotencyStore(db, insert_batch_window=0.01, insert_batch_size=100)
+    with patch.object(db, "commit", side_effect=aiosqlite.OperationalError("disk I/O error")):
+        with pytest.raises(aiosqlite.OperationalError):
+            await store.insert_or_get(_request("k-1"))
+    assert await store.get_by_idempotency_key("k-1") is None
+
+
+async def test_status_writer_coalesces_transitions(db: aiosqlite.Connection) -> None:
+    store = SQLiteIdempotencyStore(db, status_flush_window=0.01, status_flush_size=100)
+    ids = [(await store.insert_or_get(_request(f"k-{i}")))[0].id for i in range(5)]
+    with patch.object(db, "commit", wraps=db.commit) as commit:
+        await asyncio.gather(
+            *(store.mark_completed(event_id) for event_id in ids[:3]),
+            *(store.mark_processing(event_id) for event_id in ids[3:]),
+        )
+    assert commit.await_count == 1
+    assert [(await store.get_by_id(event_id)).status for event_id in ids] == ["completed"] * 3 + ["processing"] * 2
+
+
+async def test_status_writer_records_failures(db: aiosqlite.Connection) -> None:
+    store = SQLiteIdempotencyStore(db, status_flush_window=0.01, status_flush_size=100)
+    retried = (await store.insert_or_get(_request("k-1")))[0].id
+    dead = (await store.insert_or_get(_request("k-2")))[0].id
+    await asyncio.gather(
+        store.mark_failed(retried, "boom", 3, 1.0, 10.0),
+        store.mark_failed(dead, "boom", 1, 1.0, 10.0),
+    )
+    retried_event = await store.get_by_id(retried)
+    dead_event = await store.get_by_id(dead)
+    assert (retried_event.status, retried_event.attempts, retried_event.last_error) == ("pending", 1, "boom")
+    assert retried_event.retry_after is not None
+    assert (dead_event.status, dead_event.attempts) == ("failed", 1)
+
+
+async def test_status_writer_exports_flush_metrics(db: aiosqlite.Connection) -> None:
+    store = SQLiteIdempotencyStore(db, status_flush_window=0.01, status_flush_size=100)
+    event_id = (await store.insert_or_get(_request("k-1")))[0].id
+    before = REGISTRY.get_sample_value("webhook_status_flush_size_count") or 0
+    await store.mark_processing(event_id)
+    assert REGISTRY.get_sample_value("webhook_status_flush_size_count") == before + 1
+    assert REGISTRY.get_sample_value("webhook_status_flush_duration_seconds_count") >= 1
+
+
+async def test_lookups_go_through_reader_pool(tmp_path: pytest.TempPathFactory) -> None:
+    db_path = str(tmp_path / "pool.db")
+    writer = await open_db(db_path)
+    readers = await open_reader_pool(db_path, size=2)
+    store = SQLiteIdempotencyStore(writer, insert_batch_window=0.01, insert_batch_size=100, readers=readers)
+    created, _ = await store.insert_or_get(_request("k-1"))
+    with patch.object(writer, "execute", wraps=writer.execute) as writer_execute:
+        by_id = await store.get_by_id(created.id)
+        by_key = await store.get_by_idempotency_key("k-1")
+    await readers.close()
+    await writer.close()
+    assert by_id.id == by_key.id == created.id
+    writer_execute.assert_not_called()
+
+
+async def test_batch_duplicate_found_with_reader_pool(tmp_path: pytest.TempPathFactory) -> None:
+    db_path = str(tmp_path / "pool.db")
+    writer = await open_db(db_path)
+    readers = await open_reader_pool(db_path, size=1)
+    store = SQLiteIdempotencyStore(writer, insert_batch_window=0.01, insert_batch_size=100, readers=readers)
+    (first, _), (second, is_new) = await asyncio.gather(
+        store.insert_or_get(_request("k-1")), store.insert_or_get(_request("k-1"))
+    )
+    await readers.close()
+    await writer.close()
+    assert is_new is False
+    assert second.id == first.id
+
+
+async def test_cached_duplicate_skips_sqlite(db: aiosqlite.Connection) -> None:
+    store = SQLiteIdempotencyStore(db, cache=EventCache(max_size=100, ttl=60))
+    created, _ = await store.insert_or_get(_request("k-1"))
+    with patch.object(db, "execute", wraps=db.execute) as execute:
+        duplicate, is_new = await store.insert_or_get(_request("k-1"))
+        by_id = await store.get_by_id(created.id)
+        by_key = await store.get_by_idempotency_key("k-1")
+    execute.assert_not_called()
+    assert is_new is False
+    assert duplicate.id == by_id.id == by_key.id == created.id
+
+
+async def test_cache_is_written_through_on_transitions(db: aiosqlite.Connection) -> None:
+    cache = EventCache(max_size=100, ttl=60)
+    store = SQLiteIdempotencyStore(db, status_flush_window=0.01, status_flush_size=100, cache=cache)
+    event_id = (await store.insert_or_get(_request("k-1")))[0].id
+    await store.mark_processing(event_id)
+    assert cache.get_by_id(event_id).status == "processing"
+    await store.mark_failed(event_id, "boom", 3, 1.0, 10.0)
+    cached = cache.get_by_id(event_id)
+    assert (cached.status, cached.attempts, cached.last_error) == ("pending", 1, "boom")
+    await store.mark_completed(event_id)
+    assert cache.get_by_id(event_id) == await SQLiteIdempotencyStore(db).get_by_id(event_id)
+
+
+async def test_cache_is_filled_on_read_miss(db: aiosqlite.Connection) -> None:
+    event_id = (await SQLiteIdempotencyStore(db).insert_or_get(_request("k-1")))[0].id
+    cache = EventCache(max_size=100, ttl=60)
+    store = SQLiteIdempotencyStore(db, cache=cache)
+    assert await store.get_by_idempotency_key("k-1") is not None
+    assert cache.get_by_id(event_id) is not None
+    assert await store.get_by_id("missing") is None
+
+
+async def test_read_overtaken_by_transition_is_not_cached(db: aiosqlite.Connection) -> None:
+    event_id = (await SQLiteIdempotencyStore(db).insert_or_get(_request("k-1")))[0].id
+    cache = EventCache(max_size=100, ttl=60)
+    store = SQLiteIdempotencyStore(db, cache=cache)
+    fetchone = store._fetchone
+
+    async def fetch_then_transition(sql: str, params: tuple):
+        row = await fetchone(sql, params)
+        cache.update(event_id, status="completed")
+        return row
+
+    with patch.object(store, "_fetchone", side_effect=fetch_then_transition):
+        assert (await store.get_by_id(event_id)).status == "pending"
+    assert cache.get_by_id(event_id) is None
+
+
+async def test_delete_expired_evicts_cached_events(db: aiosqlite.Connection) -> None:
+    cache = EventCache(max_size=100, ttl=60)
+    store = SQLiteIdempotencyStore(db, cache=cache)
+    event_id = (await store.insert_or_get(_request("k-1")))[0].id
+    await store.mark_completed(event_id)
+    assert await store.delete_expired("9999-01-01T00:00:00+00:00") == 1
+    assert cache.get_by_id(event_id) is None
+    assert await store.get_by_id(event_id) is None
+
+
+async def test_event_rows_leave_payload_to_get_payload(db: aiosqlite.Connection) -> None:
+    store = SQLiteIdempotencyStore(db)
+    event, _ = await store.insert_or_get({"idempotency_key": "k", "event_type": "t", "payload": '{"a": 1}'})
+    loaded = await store.get_by_id(event.id)
+    assert loaded.payload is None
+    assert not hasattr(loaded, "__dict__")
+    assert await store.get_payload(event.id) == '{"a": 1}'
+    assert await store.get_payload("missing") is None
+
+
+async def test_mark_failed_returns_transition(db: aiosqlite.Connection) -> None:
+    store = SQLiteIdempotencyStore(db)
+    event, _ = await store.insert_or_get(_request("k"))
+    retry = await store.mark_failed(event.id, "boom", 2, 1.0, 10.0)
+    assert (retry.status, retry.attempts, retry.last_error) == ("pending", 1, "boom")
+    assert retry.retry_after == (await store.get_by_id(event.id)).retry_after
+    dead = await store.mark_failed(event.id, "boom", 2, 1.0, 10.0)
+    assert (dead.status, dead.attempts, dead.retry_after) == ("failed", 2, None)
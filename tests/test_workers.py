@@ -1,9 +1,12 @@
+import asyncio
 from unittest.mock import AsyncMock, patch
 
 import aiosqlite
+from prometheus_client import REGISTRY
 
 from webhook_receiver.config import Settings
 from webhook_receiver.queue import AsyncioEventQueue
+from webhook_receiver.scheduler import RetryScheduler
 from webhook_receiver.store import SQLiteIdempotencyStore
 from webhook_receiver.workers import load_pending, process_event
 
@@ -61,3 +64,59 @@ async def test_load_pending_enqueues_ids(db: aiosqlite.Connection) -> None:
     await load_pending(queue, store)
     assert queue.qsize() == 1
     assert await queue.get() == event_id
+
+
+@patch("webhook_receiver.workers.asyncio.sleep", side_effect=RuntimeError("boom"))
+async def test_process_event_schedules_retry(mock_sleep, db: aiosqlite.Connection) -> None:
+    store = SQLiteIdempotencyStore(db)
+    event_id = await _insert(store)
+    scheduler = RetryScheduler(AsyncioEventQueue(maxsize=10))
+    await process_event(event_id, store, SETTINGS, scheduler)
+    assert len(scheduler) == 1
+
+
+async def test_load_pending_restores_scheduled_retries(db: aiosqlite.Connection) -> None:
+    store = SQLiteIdempotencyStore(db)
+    event_id = await _insert(store)
+    await store.mark_failed(event_id, "boom", 3, 60.0, 600.0)
+    queue = AsyncioEventQueue(maxsize=10)
+    scheduler = RetryScheduler(queue)
+    await load_pending(queue, store, scheduler)
+    assert queue.qsize() == 0
+    assert len(scheduler) == 1
+
+
+async def test_load_pending_streams_in_chunks(db: aiosqlite.Connection) -> None:
+    store = SQLiteIdempotencyStore(db)
+    ids = [(await store.insert_or_get(REQUEST | {"idempotency_key": f"k-{i}"}))[0].id for i in range(5)]
+    await store.mark_processing(ids[3])
+    queue = AsyncioEventQueue(maxsize=10)
+    await load_pending(queue, store, chunk_size=2)
+    assert [await queue.get() for _ in range(5)] == [ids[3], ids[0], ids[1], ids[2], ids[4]]
+    assert REGISTRY.get_sample_value("webhook_recovery_remaining") == 0
+
+
+async def test_load_pending_skips_events_created_after_start(db: aiosqlite.Connection) -> None:
+    store = SQLiteIdempotencyStore(db)
+    await _insert(store)
+    await db.execute("UPDATE events SET created_at='9999-01-01T00:00:00+00:00'")
+    await db.commit()
+    queue = AsyncioEventQueue(maxsize=10)
+    await load_pending(queue, store)
+    assert queue.qsize() == 0
+
+
+@patch("webhook_receiver.workers.RECOVERY_FULL_QUEUE_WAIT", 0.001)
+async def test_load_pending_respects_queue_maxsize(db: aiosqlite.Connection) -> None:
+    store = SQLiteIdempotencyStore(db)
+    for i in range(4):
+        await store.insert_or_get(REQUEST | {"idempotency_key": f"k-{i}"})
+    queue = AsyncioEventQueue(maxsize=2)
+    recovery = asyncio.create_task(load_pending(queue, store, chunk_size=10))
+    await asyncio.sleep(0.02)
+    assert queue.qsize() == 2
+    assert REGISTRY.get_sample_value("webhook_recovery_remaining") == 4
+    for _ in range(4):
+        await queue.get()
+    await asyncio.wait_for(recovery, 1)
+    assert REGISTRY.get_sample_value("webhook_recovery_remaining") == 0